@@ -0,0 +1,106 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    fingerprint TEXT NOT NULL,
+    encoder TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (fingerprint, encoder)
+);
+CREATE TABLE IF NOT EXISTS findings (
+    fingerprint TEXT PRIMARY KEY,
+    findings TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contract_units (
+    contract_name TEXT NOT NULL,
+    unit_key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    PRIMARY KEY (contract_name, unit_key)
+);
+"""
+
+
+class AnalysisCache:
+    """
+    SQLite cache of per-unit embeddings and LLM findings, keyed by content fingerprint.
+
+    Also remembers which unit fingerprints the last submission of each named
+    contract had, so the next submission can be diffed against it.
+    """
+
+    def __init__(self, path="analysis_cache.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _placeholders(items):
+        return ", ".join("?" * len(items))
+
+    def get_embeddings(self, fingerprints, encoder):
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT fingerprint, vector FROM embeddings WHERE encoder = ? "
+                f"AND fingerprint IN ({self._placeholders(fingerprints)})",
+                (encoder, *fingerprints),
+            ).fetchall()
+        return {fp: np.frombuffer(blob, dtype=np.float32) for fp, blob in rows}
+
+    def put_embeddings(self, embeddings, encoder):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (fingerprint, encoder, vector) VALUES (?, ?, ?)",
+                [(fp, encoder, np.asarray(vec, dtype=np.float32).tobytes()) for fp, vec in embeddings.items()],
+            )
+
+    def get_findings(self, fingerprints):
+        fingerprints = list(fingerprints)
+        if not fingerprints:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT fingerprint, findings FROM findings WHERE fingerprint IN ({self._placeholders(fingerprints)})",
+                fingerprints,
+            ).fetchall()
+        return {fp: json.loads(findings) for fp, findings in rows}
+
+    def put_findings(self, findings):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO findings (fingerprint, findings, created_at) VALUES (?, ?, ?)",
+                [(fp, json.dumps(items), now) for fp, items in findings.items()],
+            )
+
+    def previous_units(self, contract_name):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT unit_key, fingerprint FROM contract_units WHERE contract_name = ?", (contract_name,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_units(self, contract_name, units):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM contract_units WHERE contract_name = ?", (contract_name,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO contract_units (contract_name, unit_key, fingerprint) VALUES (?, ?, ?)",
+                [(contract_name, unit.key, unit.fingerprint) for unit in units],
+            )
@@ -0,0 +1,209 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from safetensors.torch import load_file, save_file
+from transformers import AutoTokenizer, RobertaConfig, RobertaModel
+
+from predictor import CodeBERTFeatureExtractor, CodeRiskPredictor, inference_context, pad_features
+
+TEACHER_DIM = 768
+
+DEFAULT_STUDENT = {
+    "num_hidden_layers": 4,
+    "hidden_size": 384,
+    "num_attention_heads": 6,
+    "intermediate_size": 1536,
+}
+
+
+class StudentEncoder(nn.Module):
+    """Small RoBERTa encoder whose projected CLS embedding imitates CodeBERT's."""
+
+    def __init__(self, config):
+        super().__init__()
+        self.encoder = RobertaModel(config, add_pooling_layer=False)
+        self.projection = nn.Linear(config.hidden_size, TEACHER_DIM)
+
+    def forward(self, input_ids, attention_mask):
+        hidden = self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+        return self.projection(hidden[:, 0, :])
+
+
+def build_student(tokenizer, **overrides):
+    teacher_config = RobertaConfig.from_pretrained("microsoft/codebert-base")
+    config = RobertaConfig(
+        vocab_size=teacher_config.vocab_size,
+        max_position_embeddings=teacher_config.max_position_embeddings,
+        type_vocab_size=teacher_config.type_vocab_size,
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        **dict(DEFAULT_STUDENT, **overrides),
+    )
+    return StudentEncoder(config)
+
+
+def save_student(student, tokenizer, out_dir):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    student.encoder.config.save_pretrained(out_dir)
+    tokenizer.save_pretrained(out_dir)
+    save_file({k: v.contiguous() for k, v in student.state_dict().items()}, str(out_dir / "student.safetensors"))
+
+
+class StudentFeatureExtractor:
+    """Drop-in replacement for CodeBERTFeatureExtractor backed by a distilled student."""
+
+    def __init__(self, student_dir):
+        self.name = f"student:{Path(student_dir).resolve()}"
+        self.tokenizer = AutoTokenizer.from_pretrained(student_dir)
+        self.model = StudentEncoder(RobertaConfig.from_pretrained(student_dir))
+        self.model.load_state_dict(load_file(str(Path(student_dir) / "student.safetensors")))
+        self.model.eval()
+
+    def embed_batch(self, code_snippets, batch_size=16):
+        batches = []
+        for start in range(0, len(code_snippets), batch_size):
+            tokens = self.tokenizer(code_snippets[start:start + batch_size], return_tensors="pt",
+                                    padding=True, truncation=True, max_length=512)
+            with inference_context():
+                batches.append(self.model(tokens["input_ids"], tokens["attention_mask"]).float().numpy())
+        if not batches:
+            return np.zeros((0, TEACHER_DIM), dtype=np.float32)
+        return np.concatenate(batches)
+
+    def extract(self, code_snippet):
+        return pad_features(self.embed_batch([code_snippet]))
+
+
+def load_sources(corpus_dir):
+    return [p.read_text(encoding="utf-8", errors="ignore") for p in sorted(Path(corpus_dir).rglob("*.sol"))]
+
+
+def train(corpus_dir, out_dir, predictor=None, epochs=3, batch_size=16, lr=5e-4,
+          logit_weight=1.0, holdout=0.1, seed=42):
+    """
+    Distils CodeBERT into a small student on the contract corpus.
+
+    The loss is MSE plus cosine distance between student and teacher CLS
+    embeddings. When a predictor is given, it also includes MSE between the
+    classifier logits the two embeddings produce, so the student is pulled
+    hardest where it matters for the risk score.
+
+    Returns:
+        list: Held-out sources for evaluate()
+    """
+    rng = random.Random(seed)
+    torch.manual_seed(seed)
+    sources = load_sources(corpus_dir)
+    if not sources:
+        raise ValueError(f"No .sol files found under {corpus_dir}")
+    rng.shuffle(sources)
+    n_holdout = max(1, int(len(sources) * holdout))
+    heldout, sources = sources[:n_holdout], sources[n_holdout:]
+
+    teacher = CodeBERTFeatureExtractor()
+    student = build_student(teacher.tokenizer)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=lr)
+    if predictor is not None:
+        for param in predictor.model.parameters():
+            param.requires_grad_(False)
+
+    for epoch in range(epochs):
+        rng.shuffle(sources)
+        student.train()
+        total = 0.0
+        for start in range(0, len(sources), batch_size):
+            batch = sources[start:start + batch_size]
+            tokens = teacher.tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=512)
+            with torch.no_grad():
+                target = teacher.model(**tokens).last_hidden_state[:, 0, :]
+            output = student(tokens["input_ids"], tokens["attention_mask"])
+            loss = F.mse_loss(output, target) + (1 - F.cosine_similarity(output, target).mean())
+            if predictor is not None:
+                pad = (0, predictor.config["input_dim"] - TEACHER_DIM)
+                teacher_logits = predictor.model(F.pad(target, pad).to(predictor.device))
+                student_logits = predictor.model(F.pad(output, pad).to(predictor.device))
+                loss = loss + logit_weight * F.mse_loss(student_logits, teacher_logits)
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(batch)
+        print(f"Epoch {epoch + 1}/{epochs}: loss {total / len(sources):.4f}")
+
+    student.eval()
+    save_student(student, teacher.tokenizer, out_dir)
+    return heldout
+
+
+def count_parameters(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+def time_per_contract(extractor, sources, repeats=3):
+    extractor.embed_batch(sources[:1])  # warm up
+    timings = []
+    for _ in range(repeats):
+        for source in sources:
+            start = time.perf_counter()
+            extractor.embed_batch([source])
+            timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+
+def evaluate(student_dir, sources, predictor):
+    """
+    Compares student and teacher on held-out contracts.
+
+    Returns:
+        dict: Score agreement, median latency and size for both encoders
+    """
+    teacher = CodeBERTFeatureExtractor()
+    student = StudentFeatureExtractor(student_dir)
+    teacher_scores = predictor.predict(pad_features(teacher.embed_batch(sources))).reshape(-1)
+    student_scores = predictor.predict(pad_features(student.embed_batch(sources))).reshape(-1)
+
+    teacher_ms = time_per_contract(teacher, sources[:20])
+    student_ms = time_per_contract(student, sources[:20])
+    teacher_params = count_parameters(teacher.model)
+    student_params = count_parameters(student.model)
+    return {
+        "contracts": len(sources),
+        "score_mae": float(np.abs(teacher_scores - student_scores).mean()),
+        "score_pearson": float(np.corrcoef(teacher_scores, student_scores)[0, 1]) if len(sources) > 1 else None,
+        "decision_agreement": float(((teacher_scores > 0.5) == (student_scores > 0.5)).mean()),
+        "teacher_ms_per_contract": teacher_ms,
+        "student_ms_per_contract": student_ms,
+        "speedup": teacher_ms / student_ms,
+        "teacher_params": teacher_params,
+        "student_params": student_params,
+        # fp32 weights
+        "teacher_mb": teacher_params * 4 / 2 ** 20,
+        "student_mb": student_params * 4 / 2 ** 20,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil CodeBERT into a small student encoder")
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--out", default="model_artifacts/student")
+    parser.add_argument("--artifacts-dir", default="model_artifacts")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--embeddings-only", action="store_true", help="Skip the classifier-logit loss")
+    args = parser.parse_args()
+
+    predictor = CodeRiskPredictor(args.artifacts_dir)
+    heldout = train(args.corpus_dir, args.out, None if args.embeddings_only else predictor,
+                    epochs=args.epochs, batch_size=args.batch_size)
+    report = evaluate(args.out, heldout, predictor)
+    with open(Path(args.out) / "distill_report.json", "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
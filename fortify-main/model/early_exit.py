@@ -0,0 +1,250 @@
+import argparse
+import json
+import random
+import threading
+from collections import Counter
+from pathlib import Path
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from safetensors.torch import load_file, save_file
+
+from model_definitions import TemperatureScaling
+from predictor import CodeBERTFeatureExtractor, CodeRiskPredictor, inference_context
+
+HIDDEN_DIM = 768
+
+
+class ExitHead(nn.Module):
+    def __init__(self, hidden_dim=HIDDEN_DIM):
+        super().__init__()
+        self.fc = nn.Linear(hidden_dim, 256)
+        self.fc_out = nn.Linear(256, 1)
+        self.temperature = TemperatureScaling()
+
+    def logits(self, cls_hidden):
+        return self.fc_out(torch.relu(self.fc(cls_hidden)))
+
+    def forward(self, cls_hidden):
+        return self.temperature(self.logits(cls_hidden))
+
+
+class ExitStats:
+    """Counts which layer each request exited at."""
+
+    def __init__(self, num_layers):
+        self.num_layers = num_layers
+        self._exits = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, layers_used):
+        with self._lock:
+            self._exits[layers_used] += 1
+
+    def summary(self):
+        with self._lock:
+            requests = sum(self._exits.values())
+            layers = sum(layer * count for layer, count in self._exits.items())
+            return {
+                "requests": requests,
+                "average_layers": layers / requests if requests else None,
+                "full_depth_layers": self.num_layers,
+                "relative_cost": layers / (requests * self.num_layers) if requests else None,
+                "exits_by_layer": dict(sorted(self._exits.items())),
+            }
+
+
+class EarlyExitScorer:
+    """
+    Scores contracts layer by layer, stopping at the first confident intermediate head.
+
+    Heads sit on the CLS state after selected encoder layers and are trained
+    to reproduce the final classifier's probability. Each head has its own
+    TemperatureScaling, fitted so its confidence (max(p, 1 - p)) is
+    calibrated against the final decision. When no head reaches `threshold`,
+    the contract runs through all layers and the usual classifier.
+    """
+
+    def __init__(self, extractor, heads, threshold=0.95):
+        self.extractor = extractor
+        self.heads = {int(layer): head.eval() for layer, head in heads.items()}
+        self.threshold = threshold
+        self.stats = ExitStats(extractor.model.config.num_hidden_layers)
+
+    def score(self, code, predictor, allow_exit=True):
+        with inference_context():
+            return self._score(code, predictor, allow_exit)
+
+    def _score(self, code, predictor, allow_exit):
+        encoder = self.extractor.model
+        tokens = self.extractor.tokenizer(code, return_tensors="pt", truncation=True, max_length=512)
+        mask = encoder.get_extended_attention_mask(tokens["attention_mask"], tokens["input_ids"].shape)
+        hidden = encoder.embeddings(input_ids=tokens["input_ids"])
+
+        for depth, layer in enumerate(encoder.encoder.layer, start=1):
+            hidden = layer(hidden, attention_mask=mask)[0]
+            head = self.heads.get(depth)
+            if allow_exit and head is not None and depth < len(encoder.encoder.layer):
+                cls_hidden = hidden[:, 0, :]
+                # The calibrated confidence decides whether to exit; the score itself stays
+                # uncalibrated, on the same scale as the final classifier's probability.
+                confidence = torch.sigmoid(head(cls_hidden)).item()
+                if max(confidence, 1 - confidence) >= self.threshold:
+                    self.stats.record(depth)
+                    risk_score = torch.sigmoid(head.logits(cls_hidden)).item()
+                    return {"risk_score": risk_score, "layers_used": depth, "early_exit": True}
+
+        features = F.pad(hidden[:, 0, :].float(), (0, predictor.config["input_dim"] - HIDDEN_DIM))
+        prob = float(predictor.predict(features)[0][0])
+        self.stats.record(len(encoder.encoder.layer))
+        return {"risk_score": prob, "layers_used": len(encoder.encoder.layer), "early_exit": False}
+
+
+def save_heads(heads, out_dir, threshold, model_version):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = {f"{layer}.{k}": v.contiguous() for layer, head in heads.items() for k, v in head.state_dict().items()}
+    save_file(state, str(out_dir / "exit_heads.safetensors"))
+    with open(out_dir / "exit_heads.json", "w") as f:
+        json.dump({"layers": sorted(heads), "threshold": threshold, "model_version": model_version}, f, indent=2)
+
+
+def load_heads(heads_dir):
+    heads_dir = Path(heads_dir)
+    with open(heads_dir / "exit_heads.json") as f:
+        config = json.load(f)
+    state = load_file(str(heads_dir / "exit_heads.safetensors"))
+    heads = {}
+    for layer in config["layers"]:
+        head = ExitHead()
+        prefix = f"{layer}."
+        head.load_state_dict({k[len(prefix):]: v for k, v in state.items() if k.startswith(prefix)})
+        heads[layer] = head
+    return heads, config
+
+
+def collect_targets(extractor, predictor, sources, layers, batch_size=8):
+    """Runs the full model once, returning per-layer CLS states and the final classifier probabilities."""
+    cls_states = {layer: [] for layer in layers}
+    targets = []
+    for start in range(0, len(sources), batch_size):
+        tokens = extractor.tokenizer(sources[start:start + batch_size], return_tensors="pt",
+                                     padding=True, truncation=True, max_length=512)
+        with torch.no_grad():
+            hidden_states = extractor.model(**tokens, output_hidden_states=True).hidden_states
+            final = F.pad(hidden_states[-1][:, 0, :], (0, predictor.config["input_dim"] - HIDDEN_DIM))
+            targets.append(torch.as_tensor(predictor.predict(final)).reshape(-1))
+        for layer in layers:
+            # hidden_states[0] is the embedding output, so index i is the output of layer i.
+            cls_states[layer].append(hidden_states[layer][:, 0, :])
+    return {layer: torch.cat(states) for layer, states in cls_states.items()}, torch.cat(targets)
+
+
+def fit_head(head, train_x, train_y, epochs, batch_size, lr, seed):
+    """Mini-batch Adam on soft-target BCE against the final classifier's probabilities."""
+    generator = torch.Generator().manual_seed(seed)
+    optimizer = torch.optim.Adam(list(head.fc.parameters()) + list(head.fc_out.parameters()), lr=lr)
+    head.train()
+    for _ in range(epochs):
+        order = torch.randperm(len(train_x), generator=generator)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            optimizer.zero_grad()
+            loss = F.binary_cross_entropy_with_logits(head.logits(train_x[batch]).reshape(-1), train_y[batch])
+            loss.backward()
+            optimizer.step()
+    head.eval()
+
+
+def calibrate_head(head, calib_x, calib_y):
+    with torch.no_grad():
+        calib_logits = head.logits(calib_x).reshape(-1)
+    calib_optimizer = torch.optim.LBFGS(head.temperature.parameters(), lr=0.01, max_iter=50)
+
+    def closure():
+        calib_optimizer.zero_grad()
+        calib_loss = F.binary_cross_entropy_with_logits(head.temperature(calib_logits), (calib_y > 0.5).float())
+        calib_loss.backward()
+        return calib_loss
+
+    calib_optimizer.step(closure)
+
+
+def evaluate_head(head, x, y, threshold):
+    """Exit rate at `threshold` and agreement with the final decision on the contracts that exit."""
+    with torch.no_grad():
+        probs = torch.sigmoid(head(x)).reshape(-1)
+    confident = torch.maximum(probs, 1 - probs) >= threshold
+    agree = ((probs > 0.5) == (y > 0.5))[confident].float().mean().item() if confident.any() else None
+    return {"exit_rate": confident.float().mean().item(), "agreement": agree}
+
+
+def train_heads(corpus_dir, artifacts_dir, out_dir, layers=(3, 6, 9), epochs=30, batch_size=32, lr=1e-3,
+                threshold=0.95, holdout=0.2, min_agreement=0.98, model_version="legacy", seed=42):
+    """
+    Trains one exit head per layer to match the final head, calibrates each head's temperature,
+    and saves the heads that pass the held-out gate.
+
+    Contracts are split three ways: heads are fitted with mini-batch soft-target
+    BCE on the training split, the temperature is fitted on a calibration split
+    against the final hard decision (as TemperatureScaling is for the main
+    classifier), and exit rate and agreement are measured on a test split the
+    head has not seen. A head is kept only if at least one test contract
+    exits at `threshold` and those exits agree with the final decision at
+    least `min_agreement` of the time.
+
+    Returns:
+        dict: Layer -> held-out metrics, with "kept" set for heads that were saved
+    """
+    rng = random.Random(seed)
+    torch.manual_seed(seed)
+    sources = [p.read_text(encoding="utf-8", errors="ignore") for p in sorted(Path(corpus_dir).rglob("*.sol"))]
+    if len(sources) < 3:
+        raise ValueError(f"Need at least three .sol files under {corpus_dir}")
+    rng.shuffle(sources)
+
+    extractor = CodeBERTFeatureExtractor()
+    predictor = CodeRiskPredictor(artifacts_dir)
+    states, targets = collect_targets(extractor, predictor, sources, layers)
+    n_holdout = max(1, int(len(sources) * holdout))
+    test, calib, train = slice(0, n_holdout), slice(n_holdout, 2 * n_holdout), slice(2 * n_holdout, None)
+
+    heads, report = {}, {}
+    for layer in layers:
+        head = ExitHead()
+        fit_head(head, states[layer][train], targets[train], epochs, batch_size, lr, seed)
+        calibrate_head(head, states[layer][calib], targets[calib])
+        metrics = evaluate_head(head, states[layer][test], targets[test], threshold)
+        metrics["kept"] = metrics["agreement"] is not None and metrics["agreement"] >= min_agreement
+        print(f"Layer {layer}: temperature {head.temperature.temperature.item():.3f}, "
+              f"exits {metrics['exit_rate']:.0%} of held-out, agreement on exits {metrics['agreement']}"
+              f"{'' if metrics['kept'] else ' (dropped)'}")
+        report[layer] = metrics
+        if metrics["kept"]:
+            heads[layer] = head
+
+    if not heads:
+        raise RuntimeError(f"No exit head reached {min_agreement:.0%} held-out agreement; nothing saved")
+    save_heads(heads, out_dir, threshold, model_version)
+    with open(Path(out_dir) / "exit_heads_report.json", "w") as f:
+        json.dump({str(layer): metrics for layer, metrics in report.items()}, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train early-exit heads for the CodeBERT encoder")
+    parser.add_argument("corpus_dir")
+    parser.add_argument("--artifacts-dir", default="model_artifacts")
+    parser.add_argument("--out", default="model_artifacts/exit_heads")
+    parser.add_argument("--layers", type=int, nargs="+", default=[3, 6, 9])
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="Held-out agreement on exits a head needs to be saved")
+    parser.add_argument("--model-version", default="legacy", help="Model version the heads are trained against")
+    args = parser.parse_args()
+    train_heads(args.corpus_dir, args.artifacts_dir, args.out, layers=args.layers, epochs=args.epochs,
+                batch_size=args.batch_size, threshold=args.threshold, min_agreement=args.min_agreement,
+                model_version=args.model_version)
@@ -0,0 +1,210 @@
+import json
+import re
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Severity codes index the policy's weight vector; 0 is anything unrated ("N/A", missing, unknown).
+SEVERITY_NAMES = ["N/A", "Low", "Medium", "High", "Critical"]
+SEVERITY_CODES = {name: code for code, name in enumerate(SEVERITY_NAMES)}
+_SEVERITY_BY_LOWER = {name.lower(): name for name in SEVERITY_NAMES}
+
+LINE_RE = re.compile(r"\d+")
+
+
+def normalize_severity(severity):
+    """Canonical name from SEVERITY_NAMES for a free-text severity ("high", " HIGH "); "N/A" if unrecognised."""
+    return _SEVERITY_BY_LOWER.get(str(severity or "").strip().lower(), "N/A")
+
+
+def severity_code(severity):
+    return SEVERITY_CODES[normalize_severity(severity)]
+
+
+def severity_counts(findings):
+    """Number of findings per rated severity, most severe first: {"Critical": n, "High": n, "Medium": n, "Low": n}."""
+    counts = dict.fromkeys(reversed(SEVERITY_NAMES[1:]), 0)
+    for finding in findings:
+        severity = normalize_severity(finding.get("severity"))
+        if severity in counts:
+            counts[severity] += 1
+    return counts
+
+
+@dataclass
+class ScoringPolicy:
+    """The one place severity weights and risk bands are defined."""
+    weights: dict = field(default_factory=lambda: {"Critical": 0.4, "High": 0.25, "Medium": 0.15, "Low": 0.05})
+    cap: float = 1.0
+    # (lower bound, label) from most to least severe
+    bands: tuple = ((0.7, "critical"), (0.4, "significant"), (0.2, "moderate"), (0.0, "minor"))
+
+    def weight_vector(self):
+        return np.array([self.weights.get(name, 0.0) for name in SEVERITY_NAMES], dtype=np.float64)
+
+    def score(self, vulnerabilities):
+        """Risk score in [0, cap] for one contract's list of finding dicts."""
+        codes = [severity_code(v.get("severity")) for v in vulnerabilities]
+        return float(min(self.weight_vector()[codes].sum(), self.cap)) if codes else 0.0
+
+    def band(self, score):
+        for lower, label in self.bands:
+            if score >= lower:
+                return label
+        return self.bands[-1][1]
+
+
+DEFAULT_POLICY = ScoringPolicy()
+
+# Bands for the classifier's probability, used by /predict and the Streamlit client.
+# The policy bands above apply to the severity-weighted score of LLM findings instead.
+MODEL_SCORE_BANDS = ((0.75, "critical"), (0.5, "high"), (0.25, "moderate"), (0.0, "low"))
+
+
+def model_score_band(score, bands=MODEL_SCORE_BANDS):
+    for lower, label in bands:
+        if score >= lower:
+            return label
+    return bands[-1][1]
+
+
+def parse_lines(affected):
+    """Returns (first, last) line numbers mentioned in `affected_code_lines`, or (-1, -1)."""
+    if isinstance(affected, int):
+        return affected, affected
+    if isinstance(affected, list):
+        affected = " ".join(str(a) for a in affected)
+    numbers = LINE_RE.findall(str(affected or ""))
+    if not numbers:
+        return -1, -1
+    return int(numbers[0]), int(numbers[-1])
+
+
+def shift_lines(affected, offset):
+    """Returns `affected_code_lines` with every line number moved by `offset`, keeping its form."""
+    if isinstance(affected, int):
+        return affected + offset
+    if isinstance(affected, list):
+        return [shift_lines(a, offset) for a in affected]
+    if isinstance(affected, str):
+        return LINE_RE.sub(lambda m: str(int(m.group()) + offset), affected)
+    return affected
+
+
+class FindingsTable:
+    """
+    Columnar store of findings: one NumPy array per field, one row per finding.
+
+    contract_id indexes `contracts`, category indexes `categories` (the
+    normalised vulnerability name), and line ranges are -1 when the finding
+    gave none. Categories are free-text LLM names, so their ids get 32 bits.
+    At 17 bytes per finding, millions of findings fit comfortably in memory.
+    """
+
+    def __init__(self, contract_id, severity, category, line_start, line_end, contracts, categories):
+        self.contract_id = np.asarray(contract_id, dtype=np.int32)
+        self.severity = np.asarray(severity, dtype=np.int8)
+        self.category = np.asarray(category, dtype=np.int32)
+        self.line_start = np.asarray(line_start, dtype=np.int32)
+        self.line_end = np.asarray(line_end, dtype=np.int32)
+        self.contracts = list(contracts)
+        self.categories = list(categories)
+
+    def __len__(self):
+        return len(self.severity)
+
+    @classmethod
+    def from_analyses(cls, analyses):
+        """
+        Builds a table from (contract key, findings) pairs.
+
+        Analyses that are not lists (errors, unparsed text) still register
+        the contract, with no findings, so it gets a zero score.
+        """
+        contracts, contract_index = [], {}
+        categories, category_index = [], {}
+        columns = ([], [], [], [], [])
+        for key, findings in analyses:
+            cid = contract_index.setdefault(key, len(contracts))
+            if cid == len(contracts):
+                contracts.append(key)
+            for finding in findings if isinstance(findings, list) else []:
+                name = " ".join(str(finding.get("vulnerability_name", "unknown")).lower().split())
+                cat = category_index.setdefault(name, len(categories))
+                if cat == len(categories):
+                    categories.append(name)
+                start, end = parse_lines(finding.get("affected_code_lines"))
+                for column, value in zip(columns, (cid, severity_code(finding.get("severity")), cat, start, end)):
+                    column.append(value)
+        return cls(*columns, contracts, categories)
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            contract_id=self.contract_id, severity=self.severity, category=self.category,
+            line_start=self.line_start, line_end=self.line_end,
+            contracts=np.array(self.contracts, dtype=str), categories=np.array(self.categories, dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["contract_id"], data["severity"], data["category"], data["line_start"],
+                       data["line_end"], data["contracts"].tolist(), data["categories"].tolist())
+
+
+def contract_scores(table, policy=DEFAULT_POLICY):
+    """Per-contract risk scores in one weighted bincount."""
+    totals = np.bincount(table.contract_id, weights=policy.weight_vector()[table.severity],
+                         minlength=len(table.contracts))
+    return np.minimum(totals, policy.cap)
+
+
+def severity_histogram(table):
+    """Array of shape (contracts, len(SEVERITY_NAMES)) with finding counts per severity."""
+    n = len(SEVERITY_NAMES)
+    flat = table.contract_id.astype(np.int64) * n + table.severity
+    return np.bincount(flat, minlength=len(table.contracts) * n).reshape(-1, n)
+
+
+def portfolio_summary(table, policy=DEFAULT_POLICY, top=10):
+    """
+    Portfolio roll-up: severity and category totals, score distribution and riskiest contracts.
+    """
+    scores = contract_scores(table, policy)
+    histogram = severity_histogram(table)
+    band_edges = [lower for lower, _ in policy.bands]
+    # Number of band lower bounds strictly above the score = index of its band.
+    band_index = np.searchsorted(-np.array(band_edges), -scores, side="left")
+    band_counts = np.bincount(np.clip(band_index, 0, len(band_edges) - 1), minlength=len(band_edges))
+    category_counts = np.bincount(table.category, minlength=len(table.categories))
+    riskiest = np.argsort(-scores, kind="stable")[:top]
+    top_categories = np.argsort(-category_counts, kind="stable")[:top]
+
+    return {
+        "contracts": len(table.contracts),
+        "findings": len(table),
+        "findings_by_severity": dict(zip(SEVERITY_NAMES, histogram.sum(axis=0).tolist())),
+        "contracts_with_critical": int((histogram[:, SEVERITY_CODES["Critical"]] > 0).sum()),
+        "contracts_by_band": {label: int(c) for (_, label), c in zip(policy.bands, band_counts)},
+        "score_mean": float(scores.mean()) if len(scores) else 0.0,
+        "score_p50": float(np.percentile(scores, 50)) if len(scores) else 0.0,
+        "score_p95": float(np.percentile(scores, 95)) if len(scores) else 0.0,
+        "top_categories": [(table.categories[i], int(category_counts[i])) for i in top_categories if category_counts[i]],
+        "riskiest_contracts": [(table.contracts[i], float(scores[i])) for i in riskiest],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Portfolio roll-up over bulk audit output")
+    parser.add_argument("audits", help="JSON Lines file with {'path', 'analysis'} rows, as written by llm_scheduler.py")
+    parser.add_argument("--save", help="Also write the columnar table to this .npz path")
+    args = parser.parse_args()
+
+    with open(args.audits) as f:
+        table = FindingsTable.from_analyses((row["path"], row["analysis"]) for row in map(json.loads, f))
+    if args.save:
+        table.save(args.save)
+    print(json.dumps(portfolio_summary(table), indent=2))
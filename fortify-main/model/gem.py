@@ -1,27 +1,23 @@
-import google.generativeai as genai
 import os
 import json
 import re
 from dotenv import load_dotenv
+from findings_table import DEFAULT_POLICY, severity_code, severity_counts as count_severities
+from llm_backends import get_backend
 
 load_dotenv()
 
-def analyze_smart_contract(contract_code, api_key):
+def build_prompt(contract_code):
     """
-    Analyzes a smart contract for security vulnerabilities using the Gemini API directly.
+    Builds the audit prompt for a smart contract.
     
     Args:
         contract_code (str): The Solidity code of the smart contract
-        api_key (str): Your Gemini API key
         
     Returns:
-        dict: Analysis results
+        str: The prompt sent to Gemini
     """
-    try:
-        genai.configure(api_key=api_key)
-        
-        # Create the prompt
-        prompt = f"""
+    return f"""
         You are a security expert specializing in smart contract audits. Analyze the following smart contract code for vulnerabilities, potential security risks, and exploitable areas.
 
         SMART CONTRACT CODE:
@@ -50,32 +46,55 @@ def analyze_smart_contract(contract_code, api_key):
 
         Present your analysis as a structured JSON array where each object represents a finding/vulnerability.
         """
+
+def generate_analysis_text(prompt, api_key):
+    """
+    Sends a prompt to the configured LLM backend (Gemini unless LLM_BACKEND
+    says otherwise) and returns the raw response text.
+    
+    Unlike analyze_smart_contract, API errors (rate limits, timeouts) are raised
+    so callers can retry them.
+    """
+    return get_backend().generate(prompt, api_key)
+
+def parse_analysis(result):
+    """
+    Parses Gemini's response text into a list of findings.
+    
+    Args:
+        result (str): Raw response text
         
-        # Configure the model
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-pro",
-            generation_config={"temperature": 0.2}
-        )
-        
-        # Generate response
-        response = model.generate_content(prompt)
-        result = response.text
+    Returns:
+        list or dict: Parsed findings, or {"raw_analysis": text} if parsing fails
+    """
+    # Extract JSON from the response if it's wrapped in code blocks
+    json_pattern = r'```(?:json)?\s*(\[.*?\])\s*```'
+    json_match = re.search(json_pattern, result, re.DOTALL)
+    
+    if json_match:
+        result = json_match.group(1)
         
-        # Extract JSON from the response if it's wrapped in code blocks
-        json_pattern = r'```(?:json)?\s*(\[.*?\])\s*```'
-        json_match = re.search(json_pattern, result, re.DOTALL)
+    # Try to parse the result as JSON
+    try:
+        parsed_result = json.loads(result)
+        return parsed_result
+    except json.JSONDecodeError:
+        # If parsing fails, return the raw text
+        return {"raw_analysis": result}
+
+def analyze_smart_contract(contract_code, api_key):
+    """
+    Analyzes a smart contract for security vulnerabilities using the Gemini API directly.
+    
+    Args:
+        contract_code (str): The Solidity code of the smart contract
+        api_key (str): Your Gemini API key
         
-        if json_match:
-            result = json_match.group(1)
-            
-        # Try to parse the result as JSON
-        try:
-            parsed_result = json.loads(result)
-            return parsed_result
-        except json.JSONDecodeError:
-            # If parsing fails, return the raw text
-            return {"raw_analysis": result}
-            
+    Returns:
+        dict: Analysis results
+    """
+    try:
+        return parse_analysis(generate_analysis_text(build_prompt(contract_code), api_key))
     except Exception as e:
         return {"error": str(e)}
 
@@ -83,36 +102,15 @@ def calculate_risk_score(vulnerabilities):
     """
     Calculate a risk score between 0-1 based on the vulnerabilities found.
     
+    Severity weights come from the shared ScoringPolicy in findings_table.py.
+    
     Args:
         vulnerabilities: List of vulnerability objects
         
     Returns:
         float: Risk score between 0-1
     """
-    severity_weights = {
-        "Critical": 0.4,
-        "High": 0.25,
-        "Medium": 0.15,
-        "Low": 0.05,
-        "N/A": 0
-    }
-    
-    total_score = 0
-    max_score = 0
-    
-    for vuln in vulnerabilities:
-        severity = vuln.get("severity", "N/A")
-        if severity in severity_weights:
-            total_score += severity_weights[severity]
-            max_score += 0.4  # Maximum possible weight (Critical)
-    
-    # Normalize to 0-1 scale
-    if max_score > 0:
-        normalized_score = min(total_score, 1.0)
-    else:
-        normalized_score = 0
-        
-    return round(normalized_score, 2)
+    return round(DEFAULT_POLICY.score(vulnerabilities), 2)
 
 def generate_readable_report(analysis_results):
     """
@@ -136,6 +134,7 @@ def generate_readable_report(analysis_results):
     
     # Calculate risk score
     risk_score = calculate_risk_score(vulnerabilities)
+    band = DEFAULT_POLICY.band(risk_score)
     
     # Start building the report
     report = "SMART CONTRACT SECURITY ANALYSIS REPORT\n"
@@ -149,14 +148,8 @@ def generate_readable_report(analysis_results):
     report += "-" * 20 + "\n"
     
     # Count vulnerabilities by severity
-    severity_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
-    real_vulnerabilities = []
-    
-    for vuln in vulnerabilities:
-        severity = vuln.get("severity", "N/A")
-        if severity in severity_counts and severity != "N/A":
-            severity_counts[severity] += 1
-            real_vulnerabilities.append(vuln)
+    severity_counts = count_severities(vulnerabilities)
+    real_vulnerabilities = [vuln for vuln in vulnerabilities if severity_code(vuln.get("severity")) > 0]
     
     # Create summary text
     if sum(severity_counts.values()) == 0:
@@ -167,11 +160,11 @@ def generate_readable_report(analysis_results):
             if count > 0:
                 report += f"- {count} {severity} severity issue{'s' if count > 1 else ''}\n"
         
-        if risk_score >= 0.7:
+        if band == "critical":
             report += "\nThis contract has CRITICAL security concerns that must be addressed before deployment.\n"
-        elif risk_score >= 0.4:
+        elif band == "significant":
             report += "\nThis contract has SIGNIFICANT security concerns that should be addressed.\n"
-        elif risk_score >= 0.2:
+        elif band == "moderate":
             report += "\nThis contract has MODERATE security concerns that would benefit from remediation.\n"
         else:
             report += "\nThis contract has MINOR security concerns with relatively low risk.\n"
@@ -222,11 +215,11 @@ def generate_readable_report(analysis_results):
     report += "CONCLUSION:\n"
     report += "-" * 20 + "\n"
     
-    if risk_score >= 0.7:
+    if band == "critical":
         report += "The analyzed smart contract contains serious security vulnerabilities that require immediate attention. DO NOT deploy this contract until these issues have been fixed and verified.\n"
-    elif risk_score >= 0.4:
+    elif band == "significant":
         report += "The analyzed smart contract contains notable security concerns. It is recommended to address these issues before deploying this contract to a production environment.\n"
-    elif risk_score >= 0.2:
+    elif band == "moderate":
         report += "The analyzed smart contract contains some minor security concerns. While not critical, addressing these issues would improve the overall security posture of the contract.\n"
     else:
         report += "The analyzed smart contract appears to be relatively secure with only minor issues identified. As with any smart contract, continue to follow security best practices and consider a professional audit before major deployments.\n"
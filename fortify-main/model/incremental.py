@@ -0,0 +1,132 @@
+from findings_table import shift_lines
+from llm_scheduler import INTERACTIVE
+from predictor import pad_features
+from solidity_units import Unit, fingerprint, mask_comments_and_strings, split_units
+
+
+def units_or_whole_file(code):
+    units = split_units(code)
+    if units:
+        return units
+    # Nothing but pragmas and imports; still audit the file as one unit.
+    return [Unit(key="file", kind="file", name="file", contract="", source=code, start=0, end=len(code),
+                 fingerprint=fingerprint(mask_comments_and_strings(code, strings=False)))]
+
+
+def unit_prompt_source(unit):
+    if unit.kind == "contract" or not unit.contract:
+        return unit.source
+    return f"// Excerpt: {unit.kind} of contract {unit.contract}\n{unit.source}"
+
+
+def prompt_line_offset(unit, code):
+    """Number to add to a line number in unit_prompt_source(unit) to get the line in `code`."""
+    header_lines = unit_prompt_source(unit).count("\n") - unit.source.count("\n")
+    return code.count("\n", 0, unit.start) - header_lines
+
+
+class IncrementalAnalyzer:
+    """
+    Re-analyses a contract by unit, recomputing only what changed since the last submission.
+
+    LLM findings are cached per unit fingerprint, so a unit is audited once
+    no matter how often it is resubmitted. The risk score always comes from
+    the whole-file CLS embedding, the input the classifier was trained on;
+    it is cached under the file fingerprint, so only resubmitting unchanged
+    code skips the encoder. Unit-level audits see one unit at a time and can
+    miss issues that only show up across functions; use a full audit for those.
+    """
+
+    def __init__(self, extractor, cache, scheduler=None):
+        self.extractor = extractor
+        self.cache = cache
+        self.scheduler = scheduler
+
+    def diff(self, units, contract_name):
+        previous = self.cache.previous_units(contract_name) if contract_name else {}
+        statuses = {}
+        for unit in units:
+            if unit.key not in previous:
+                statuses[unit.key] = "added"
+            elif previous[unit.key] == unit.fingerprint:
+                statuses[unit.key] = "unchanged"
+            else:
+                statuses[unit.key] = "changed"
+        current = {unit.key for unit in units}
+        removed = sorted(key for key in previous if key not in current)
+        return statuses, removed
+
+    def embed_file(self, code):
+        """Returns (whole-file CLS embedding, whether the encoder had to run)."""
+        file_fp = fingerprint(mask_comments_and_strings(code, strings=False))
+        embeddings = self.cache.get_embeddings({file_fp}, self.extractor.name)
+        if file_fp in embeddings:
+            return embeddings[file_fp], False
+        embedding = self.extractor.embed_batch([code])[0]
+        self.cache.put_embeddings({file_fp: embedding}, self.extractor.name)
+        return embedding, True
+
+    def audit_units(self, units, priority=INTERACTIVE):
+        """Returns (fingerprint -> findings list, number of units audited)."""
+        if self.scheduler is None:
+            raise RuntimeError("Unit findings need an LLM scheduler")
+        findings = self.cache.get_findings({u.fingerprint for u in units})
+        missing = {}
+        for unit in units:
+            if unit.fingerprint not in findings and unit.fingerprint not in missing:
+                missing[unit.fingerprint] = self.scheduler.submit(unit_prompt_source(unit), priority)
+        fresh = {}
+        for fp, future in missing.items():
+            result = future.result()
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            # Unparseable responses are not cached so the unit is retried next time.
+            if isinstance(result, list):
+                fresh[fp] = result
+            findings[fp] = result if isinstance(result, list) else []
+        self.cache.put_findings(fresh)
+        return findings, len(missing)
+
+    def analyze(self, code, contract_name=None, with_findings=False, priority=INTERACTIVE):
+        """
+        Analyses `code`, reusing cached work for units unchanged since the last submission.
+
+        Args:
+            code (str): Solidity source
+            contract_name (str): Name tying this submission to earlier ones; no diff if omitted
+            with_findings (bool): Also collect LLM findings per unit
+
+        Returns:
+            dict: Unit statuses, contract features (1, 774), findings and recompute counts
+        """
+        units = units_or_whole_file(code)
+        statuses, removed = self.diff(units, contract_name)
+        embedding, encoded = self.embed_file(code)
+        features = pad_features(embedding.reshape(1, -1))
+
+        findings, audited = [], 0
+        if with_findings:
+            unit_findings, audited = self.audit_units(units, priority)
+            for unit in units:
+                offset = prompt_line_offset(unit, code)
+                for finding in unit_findings[unit.fingerprint]:
+                    finding = dict(finding, unit=unit.key)
+                    if "affected_code_lines" in finding:
+                        finding["affected_code_lines"] = shift_lines(finding["affected_code_lines"], offset)
+                    findings.append(finding)
+
+        if contract_name:
+            self.cache.save_units(contract_name, units)
+
+        return {
+            "units": [dict(u.to_dict(), status=statuses[u.key]) for u in units],
+            "removed_units": removed,
+            "features": features,
+            "findings": findings,
+            "stats": {
+                "units": len(units),
+                "changed_units": sum(s != "unchanged" for s in statuses.values()),
+                "encoded_file": encoded,
+                "audited_units": audited,
+            },
+        }
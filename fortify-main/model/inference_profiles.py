@@ -0,0 +1,224 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+import torch
+
+from predictor import CODE_SAMPLE, CodeBERTFeatureExtractor, CodeRiskPredictor, set_inference_profile
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_LENGTHS = (128, 256, 512)
+DEFAULT_RECORD = "inference_profiles.json"
+
+
+@dataclass
+class InferenceProfile:
+    name: str
+    precision: str = "fp32"          # "fp32" or "bf16" (CPU autocast)
+    inference_mode: bool = False     # torch.inference_mode instead of torch.no_grad
+    compile: bool = False            # torch.compile the encoder
+    intra_op_threads: int = 0        # 0 keeps PyTorch's default
+    inter_op_threads: int = 0
+
+    def context(self):
+        stack = ExitStack()
+        stack.enter_context(torch.inference_mode() if self.inference_mode else torch.no_grad())
+        if self.precision == "bf16":
+            stack.enter_context(torch.autocast("cpu", dtype=torch.bfloat16))
+        return stack
+
+
+PROFILES = {
+    "fp32-eager": InferenceProfile("fp32-eager"),
+    "fp32-inference": InferenceProfile("fp32-inference", inference_mode=True),
+    "bf16-autocast": InferenceProfile("bf16-autocast", precision="bf16", inference_mode=True),
+    "fp32-compiled": InferenceProfile("fp32-compiled", inference_mode=True, compile=True),
+}
+
+REFERENCE = "fp32-eager"
+
+
+def machine_type():
+    """Key identifying this kind of host: architecture, CPU model and core count."""
+    model = platform.processor() or "unknown"
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return f"{platform.machine()}|{model}|{os.cpu_count()}cpu"
+
+
+def apply_profile(profile):
+    """
+    Makes `profile` the process-wide inference setting.
+
+    Thread counts are global to the process, and PyTorch only accepts the
+    inter-op count before any parallel work has run, so call this at startup
+    before any model is loaded; use prepare_extractor for each encoder after.
+    """
+    if profile.intra_op_threads:
+        torch.set_num_threads(profile.intra_op_threads)
+    if profile.inter_op_threads:
+        try:
+            torch.set_num_interop_threads(profile.inter_op_threads)
+        except RuntimeError as e:
+            logger.warning("Could not set inter-op threads: %s", e)
+    set_inference_profile(profile)
+
+
+def prepare_extractor(profile, extractor):
+    """Applies the per-encoder part of `profile` (compilation) to a loaded feature extractor."""
+    if profile.compile:
+        extractor.model = torch.compile(extractor.model)
+    return extractor
+
+
+def load_profile(record_path=DEFAULT_RECORD, name=None):
+    """
+    Returns the profile named by `name` (or INFERENCE_PROFILE), else the one tuned for this
+    machine type in the record file, else None to keep the default fp32 no_grad path.
+    """
+    name = name or os.getenv("INFERENCE_PROFILE")
+    if name:
+        return PROFILES[name]
+    if not Path(record_path).exists():
+        return None
+    with open(record_path) as f:
+        best = json.load(f).get(machine_type())
+    return InferenceProfile(**best["profile"]) if best else None
+
+
+def sample_inputs(tokenizer, lengths=SEQUENCE_LENGTHS):
+    """Contracts truncated to exactly each representative token length."""
+    body, copies = CODE_SAMPLE, 1
+    while len(tokenizer(body)["input_ids"]) < max(lengths):
+        body += "\n" + CODE_SAMPLE.replace("SimpleStorage", f"SimpleStorage{copies}")
+        copies += 1
+    ids = tokenizer(body)["input_ids"][1:-1]
+    return {length: tokenizer.decode(ids[:length - 2]) for length in lengths}
+
+
+def drift_sample(corpus_dir, size=32, seed=0):
+    """A fixed random sample of contracts from `corpus_dir`, the same for every candidate."""
+    paths = sorted(Path(corpus_dir).rglob("*.sol"))
+    if not paths:
+        raise ValueError(f"No .sol files under {corpus_dir}")
+    return [p.read_text(encoding="utf-8", errors="ignore") for p in random.Random(seed).sample(paths, min(size, len(paths)))]
+
+
+def bench(profile, artifacts_dir, corpus_dir=None, drift_samples=32, repeats=10):
+    """
+    Times one-contract encoding plus scoring for each sequence length under `profile`,
+    and scores a fixed sample of `corpus_dir` contracts for the drift check.
+    """
+    apply_profile(profile)
+    extractor = prepare_extractor(profile, CodeBERTFeatureExtractor())
+    predictor = CodeRiskPredictor(artifacts_dir)
+    latency = {}
+    for length, text in sample_inputs(extractor.tokenizer).items():
+        for _ in range(2):  # warm up (and trigger compilation)
+            predictor.predict(extractor.extract(text))
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            predictor.predict(extractor.extract(text))
+            timings.append((time.perf_counter() - start) * 1000)
+        latency[length] = statistics.median(timings)
+    sources = drift_sample(corpus_dir, drift_samples) if corpus_dir else []
+    scores = [float(predictor.predict(extractor.extract(code))[0][0]) for code in sources]
+    return {"ms_p50": latency, "scores": scores}
+
+
+def run_isolated(profile, artifacts_dir, corpus_dir, drift_samples):
+    # Each candidate runs in a fresh interpreter so its thread settings actually take effect.
+    output = subprocess.run(
+        [sys.executable, __file__, "bench", "--profile-json", json.dumps(asdict(profile)),
+         "--artifacts-dir", artifacts_dir, "--corpus-dir", corpus_dir, "--drift-samples", str(drift_samples)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    results = json.loads(output.strip().splitlines()[-1])
+    results["ms_p50"] = {int(k): v for k, v in results["ms_p50"].items()}
+    return results
+
+
+def candidates():
+    cores = os.cpu_count() or 1
+    thread_options = sorted({(cores, 1), (max(1, cores // 2), 1), (max(1, cores // 2), 2)})
+    yield PROFILES[REFERENCE]
+    for name, profile in PROFILES.items():
+        if name == REFERENCE:
+            continue
+        for intra, inter in thread_options:
+            yield replace(profile, name=f"{name}-t{intra}x{inter}", intra_op_threads=intra, inter_op_threads=inter)
+
+
+def autotune(artifacts_dir, corpus_dir, record_path=DEFAULT_RECORD, max_drift=0.01, drift_samples=32):
+    """
+    Benchmarks every profile and thread setting, measures score drift against fp32-eager
+    on a sample of `corpus_dir` (use contracts held out from training), and records the
+    fastest profile within `max_drift` for this machine type.
+    """
+    reference = run_isolated(PROFILES[REFERENCE], artifacts_dir, corpus_dir, drift_samples)
+    report = []
+    for profile in candidates():
+        try:
+            results = reference if profile.name == REFERENCE else run_isolated(
+                profile, artifacts_dir, corpus_dir, drift_samples)
+        except subprocess.CalledProcessError as e:
+            print(f"{profile.name}: failed ({e.stderr.strip().splitlines()[-1] if e.stderr else e})")
+            continue
+        drift = max(abs(a - b) for a, b in zip(results["scores"], reference["scores"]))
+        mean_ms = statistics.mean(results["ms_p50"].values())
+        latencies = ", ".join(f"{n}tok {ms:.1f}ms" for n, ms in results["ms_p50"].items())
+        print(f"{profile.name}: {latencies}; max score drift {drift:.2e} over {len(results['scores'])} contracts")
+        report.append({"profile": asdict(profile), "mean_ms": mean_ms, "max_drift": drift,
+                       "ms_p50": results["ms_p50"]})
+
+    eligible = [r for r in report if r["max_drift"] <= max_drift]
+    best = min(eligible, key=lambda r: r["mean_ms"])
+    records = json.loads(Path(record_path).read_text()) if Path(record_path).exists() else {}
+    records[machine_type()] = dict(best, tuned_at=int(time.time()), candidates=report)
+    Path(record_path).write_text(json.dumps(records, indent=2))
+    print(f"Best profile for {machine_type()}: {best['profile']['name']} ({best['mean_ms']:.1f} ms)")
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark and auto-tune CPU inference profiles")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tune_cmd = sub.add_parser("autotune")
+    tune_cmd.add_argument("corpus_dir", help="Held-out .sol contracts for the score drift check")
+    tune_cmd.add_argument("--artifacts-dir", default="model_artifacts")
+    tune_cmd.add_argument("--record", default=DEFAULT_RECORD)
+    tune_cmd.add_argument("--max-drift", type=float, default=0.01)
+    tune_cmd.add_argument("--drift-samples", type=int, default=32)
+
+    bench_cmd = sub.add_parser("bench")
+    bench_cmd.add_argument("--profile", choices=sorted(PROFILES), default=REFERENCE)
+    bench_cmd.add_argument("--profile-json", help=argparse.SUPPRESS)
+    bench_cmd.add_argument("--artifacts-dir", default="model_artifacts")
+    bench_cmd.add_argument("--corpus-dir")
+    bench_cmd.add_argument("--drift-samples", type=int, default=32)
+
+    args = parser.parse_args()
+    if args.command == "autotune":
+        autotune(args.artifacts_dir, args.corpus_dir, args.record, args.max_drift, args.drift_samples)
+    else:
+        profile = InferenceProfile(**json.loads(args.profile_json)) if args.profile_json else PROFILES[args.profile]
+        print(json.dumps(bench(profile, args.artifacts_dir, args.corpus_dir, args.drift_samples)))
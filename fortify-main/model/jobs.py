@@ -0,0 +1,249 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEPTHS = {
+    "score": ["score"],
+    "audit": ["audit"],
+    "both": ["score", "audit"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    depth TEXT NOT NULL,
+    model_version TEXT,
+    contract_name TEXT,
+    code TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_hash_depth ON jobs (content_hash, depth);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+"""
+
+
+def content_hash(code):
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    SQLite-backed job table; survives restarts and de-duplicates by contract hash.
+
+    Several server processes may share one database. Workers refresh
+    `updated_at` on their running jobs every few seconds (see touch()), so a
+    running job with no refresh for `stale_after` seconds belonged to a
+    process that died: claim_next() picks it up again and submit() no
+    longer de-duplicates onto it.
+    """
+
+    def __init__(self, path="jobs.db", stale_after=60):
+        self.path = path
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "model_version" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN model_version TEXT")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, code, depth, contract_name=None, model_version=None, force=False):
+        """
+        Queues a job, or returns the existing one for the same code, depth and model version.
+
+        Args:
+            code (str): Contract source
+            depth (str): One of DEPTHS
+            contract_name (str): Optional display name
+            model_version (str): Version the score step will run against, so a
+                hot-swapped model never reuses the previous model's result
+            force (bool): Always queue a new job, e.g. to re-run an LLM audit
+
+        Returns:
+            tuple: (job dict, created flag)
+        """
+        if depth not in DEPTHS:
+            raise ValueError(f"Unknown depth {depth!r}, expected one of {sorted(DEPTHS)}")
+        digest = content_hash(code)
+        with self._lock, self._connect() as conn:
+            row = None if force else conn.execute(
+                "SELECT * FROM jobs WHERE content_hash = ? AND depth = ? AND model_version IS ? "
+                "AND status != 'failed' AND NOT (status = 'running' AND updated_at < ?) "
+                "ORDER BY created_at DESC LIMIT 1",
+                (digest, depth, model_version, time.time() - self.stale_after),
+            ).fetchone()
+            if row:
+                return self._to_dict(row), False
+            now = time.time()
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, content_hash, depth, model_version, contract_name, code, status, progress, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'queued', 0, ?, ?)",
+                (job_id, digest, depth, model_version, contract_name, code, now, now),
+            )
+        return self.get(job_id), True
+
+    def get(self, job_id, include_code=False):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row, include_code) if row else None
+
+    def claim_next(self):
+        """Claims the oldest queued job, or a running job whose worker stopped refreshing it."""
+        # Several server processes may share the database, so the claim itself
+        # must be atomic: only the worker whose UPDATE still sees it claimable wins.
+        claimable = "(status = 'queued' OR (status = 'running' AND updated_at < ?))"
+        while True:
+            now = time.time()
+            with self._connect() as conn:
+                row = conn.execute(
+                    f"SELECT id FROM jobs WHERE {claimable} ORDER BY created_at LIMIT 1",
+                    (now - self.stale_after,),
+                ).fetchone()
+                if not row:
+                    return None
+                claimed = conn.execute(
+                    f"UPDATE jobs SET status = 'running', stage = NULL, progress = 0, updated_at = ? "
+                    f"WHERE id = ? AND {claimable}",
+                    (now, row["id"], now - self.stale_after),
+                ).rowcount
+            if claimed:
+                return self.get(row["id"], include_code=True)
+
+    def touch(self, job_ids):
+        """Marks running jobs as still alive."""
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'",
+                [(time.time(), job_id) for job_id in job_ids],
+            )
+
+    def update(self, job_id, **fields):
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    @staticmethod
+    def _to_dict(row, include_code=False):
+        job = dict(row)
+        if not include_code:
+            job.pop("code")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class JobWorkerPool:
+    """
+    Runs queued jobs on a fixed number of threads.
+
+    `handlers` maps each analysis step ("score", "audit") to a callable taking
+    (code, contract_name) and returning a JSON-serialisable result.
+    `on_complete(job, result)` is called after a job succeeds.
+    """
+
+    def __init__(self, store, handlers, concurrency=2, poll_interval=1.0, on_complete=None):
+        self.store = store
+        self.handlers = handlers
+        self.on_complete = on_complete
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._active = set()
+        self._active_lock = threading.Lock()
+
+    def start(self):
+        self._stopping.clear()
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            job = self.store.claim_next()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _heartbeat(self):
+        # Refresh well inside stale_after so live jobs are never reclaimed.
+        while not self._stopping.wait(self.store.stale_after / 4):
+            with self._active_lock:
+                active = list(self._active)
+            try:
+                self.store.touch(active)
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    def _process(self, job):
+        with self._active_lock:
+            self._active.add(job["id"])
+        try:
+            self._run_steps(job)
+        finally:
+            with self._active_lock:
+                self._active.discard(job["id"])
+
+    def _run_steps(self, job):
+        steps = DEPTHS[job["depth"]]
+        result = {}
+        try:
+            for i, step in enumerate(steps):
+                self.store.update(job["id"], stage=step, progress=i / len(steps))
+                result[step] = self.handlers[step](job["code"], job["contract_name"])
+            self.store.update(job["id"], status="done", stage=None, progress=1.0, result=result)
+        except Exception as e:
+            logger.exception("Job %s failed", job["id"])
+            self.store.update(job["id"], status="failed", error=str(e), result=result or None)
+            return
+        if self.on_complete:
+            try:
+                self.on_complete(job, result)
+            except Exception:
+                logger.exception("on_complete hook failed for job %s", job["id"])
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import google.generativeai as genai
+import google.ai.generativelanguage as glm
+
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+
+SYNTHETIC_FINDINGS = [
+    ("Reentrancy", "External call is made before the balance is updated."),
+    ("Unchecked Call Return Value", "The return value of a low-level call is ignored."),
+    ("Missing Access Control", "A state-changing function can be called by any account."),
+    ("Integer Overflow", "Arithmetic on user-supplied values is not bounded."),
+    ("Front-Running", "Transaction ordering can be exploited by observers of the mempool."),
+    ("Denial of Service", "An unbounded loop over user-controlled data can exceed the block gas limit."),
+]
+
+
+def prompt_hash(prompt):
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class TransientBackendError(Exception):
+    """Injected failure carrying an HTTP-like status `code`, so the scheduler treats it like a real API error."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class LLMBackend:
+    # Whether calls count against a provider quota; offline backends are scheduled without key budgets.
+    rate_limited = True
+
+    def generate(self, prompt, api_key):
+        """Returns the raw response text for `prompt`."""
+        raise NotImplementedError
+
+
+def with_api_key(model, api_key):
+    """
+    Points a GenerativeModel at its own client for `api_key`.
+
+    google-generativeai (checked against 0.3 to 0.8) has no public per-model
+    key: genai.configure() sets one global key, and GenerativeModel only uses
+    its private `_client` attribute instead of the global client when it is
+    set. Re-check this when upgrading the library.
+    """
+    if not hasattr(model, "_client"):
+        raise RuntimeError("This google-generativeai version has no GenerativeModel._client; per-key clients need updating")
+    model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+    return model
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, model_name="gemini-1.5-pro", temperature=0.2):
+        self.model_name = model_name
+        self.temperature = temperature
+        self._models = {}
+
+    def _get_model(self, api_key):
+        # genai.configure() sets one global key, so each key gets its own client
+        # to allow concurrent calls with different keys.
+        if api_key not in self._models:
+            model = genai.GenerativeModel(
+                model_name=self.model_name,
+                generation_config={"temperature": self.temperature}
+            )
+            self._models[api_key] = with_api_key(model, api_key)
+        return self._models[api_key]
+
+    def generate(self, prompt, api_key):
+        return self._get_model(api_key).generate_content(prompt).text
+
+
+class RecordingBackend(LLMBackend):
+    """Passes calls through to `inner` and saves each response under its prompt hash."""
+
+    def __init__(self, inner, recordings_dir):
+        self.inner = inner
+        self.rate_limited = inner.rate_limited
+        self.recordings_dir = Path(recordings_dir)
+        self.recordings_dir.mkdir(parents=True, exist_ok=True)
+
+    def generate(self, prompt, api_key):
+        text = self.inner.generate(prompt, api_key)
+        digest = prompt_hash(prompt)
+        tmp = self.recordings_dir / f"{digest}.json.tmp"
+        tmp.write_text(json.dumps({"prompt_hash": digest, "recorded_at": int(time.time()), "text": text}))
+        os.replace(tmp, self.recordings_dir / f"{digest}.json")
+        return text
+
+
+class ReplayBackend(LLMBackend):
+    """Serves recorded responses offline; prompts that were never recorded raise ReplayMissError."""
+
+    rate_limited = False
+
+    def __init__(self, recordings_dir):
+        self.recordings_dir = Path(recordings_dir)
+        self._cache = {}
+
+    def generate(self, prompt, api_key):
+        digest = prompt_hash(prompt)
+        if digest not in self._cache:
+            path = self.recordings_dir / f"{digest}.json"
+            if not path.exists():
+                raise ReplayMissError(f"No recording for prompt {digest[:12]} in {self.recordings_dir}")
+            self._cache[digest] = json.loads(path.read_text())["text"]
+        return self._cache[digest]
+
+
+class SyntheticBackend(LLMBackend):
+    """
+    Generates schema-valid findings without any network access.
+
+    Latency is drawn from a log-normal distribution (median `latency_ms`,
+    shape `latency_sigma`; sigma 0 gives a fixed delay) and a fraction
+    `error_rate` of calls fail with a 429 or 503. Output and failures are
+    seeded by the prompt hash and per-prompt call count, so a run is
+    reproducible for a given seed.
+    """
+
+    rate_limited = False
+
+    def __init__(self, latency_ms=800.0, latency_sigma=0.5, error_rate=0.0, seed=0, max_findings=4):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.seed = seed
+        self.max_findings = max_findings
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, api_key):
+        digest = prompt_hash(prompt)
+        with self._lock:
+            attempt = self._calls.get(digest, 0)
+            self._calls[digest] = attempt + 1
+        rng = random.Random(f"{self.seed}:{digest}:{attempt}")
+
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms * rng.lognormvariate(0, self.latency_sigma) / 1000)
+        if rng.random() < self.error_rate:
+            code = rng.choice([429, 503])
+            raise TransientBackendError(code, f"Synthetic error {code}")
+
+        # Findings depend only on the prompt, not on the attempt, like a real model at low temperature.
+        rng = random.Random(f"{self.seed}:{digest}")
+        findings = []
+        for _ in range(rng.randint(0, self.max_findings)):
+            name, description = rng.choice(SYNTHETIC_FINDINGS)
+            start = rng.randint(1, 200)
+            findings.append({
+                "vulnerability_name": name,
+                "severity": rng.choice(SEVERITIES),
+                "description": description,
+                "exploitation_scenario": f"An attacker can abuse {name.lower()} to drain or lock funds.",
+                "affected_code_lines": f"{start}-{start + rng.randint(0, 10)}",
+                "recommended_fix": "Apply the checks-effects-interactions pattern and add explicit validation.",
+            })
+        return f"```json\n{json.dumps(findings, indent=2)}\n```"
+
+
+def backend_from_env():
+    """
+    Builds the backend selected by LLM_BACKEND: gemini (default), record, replay or synthetic.
+    """
+    mode = os.getenv("LLM_BACKEND", "gemini")
+    recordings_dir = os.getenv("LLM_RECORDINGS_DIR", "llm_recordings")
+    if mode == "gemini":
+        return GeminiBackend()
+    if mode == "record":
+        return RecordingBackend(GeminiBackend(), recordings_dir)
+    if mode == "replay":
+        return ReplayBackend(recordings_dir)
+    if mode == "synthetic":
+        return SyntheticBackend(
+            latency_ms=float(os.getenv("LLM_SYNTH_LATENCY_MS", "800")),
+            latency_sigma=float(os.getenv("LLM_SYNTH_LATENCY_SIGMA", "0.5")),
+            error_rate=float(os.getenv("LLM_SYNTH_ERROR_RATE", "0")),
+            seed=int(os.getenv("LLM_SYNTH_SEED", "0")),
+        )
+    raise ValueError(f"Unknown LLM_BACKEND {mode!r}")
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = backend_from_env()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+if __name__ == "__main__":
+    import argparse
+    import statistics
+
+    from gem import generate_readable_report
+    from llm_scheduler import LLMScheduler, BULK
+
+    parser = argparse.ArgumentParser(description="Offline load test of the audit path on the synthetic backend")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    set_backend(SyntheticBackend(latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed))
+    scheduler = LLMScheduler(
+        api_keys=[f"synthetic-{i}" for i in range(args.keys)],
+        requests_per_minute=1e9,
+        tokens_per_minute=1e12,
+        workers=args.workers,
+        base_delay=0.01,
+    )
+
+    latencies = []
+
+    def track(future, sent_at):
+        future.add_done_callback(lambda f: latencies.append(time.perf_counter() - sent_at))
+        return future
+
+    start = time.perf_counter()
+    futures = [track(scheduler.submit(f"contract C{i} {{}}", BULK), time.perf_counter()) for i in range(args.requests)]
+    errors = 0
+    for future in futures:
+        analysis = future.result()
+        generate_readable_report(analysis)
+        errors += isinstance(analysis, dict) and "error" in analysis
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.0f} req/s), {errors} errors")
+    print(f"latency p50={statistics.median(latencies) * 1000:.0f}ms p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.0f}ms")
@@ -0,0 +1,242 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from gem import build_prompt, generate_analysis_text, parse_analysis
+from llm_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BULK = 1
+
+# HTTP status codes worth retrying: rate limited, server error, unavailable, timeout.
+TRANSIENT_CODES = {429, 500, 503, 504}
+
+
+def is_transient(exc):
+    code = getattr(exc, "code", None)
+    code = getattr(code, "value", code)  # grpc StatusCode / HTTPStatus enums
+    return code in TRANSIENT_CODES or isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def is_rate_limit(exc):
+    code = getattr(exc, "code", None)
+    return getattr(code, "value", code) == 429
+
+
+def load_api_keys():
+    """Reads the key pool from GEMINI_API_KEYS (comma separated), falling back to GEMINI_API_KEY and GEMINI_KEY_2."""
+    keys = os.getenv("GEMINI_API_KEYS")
+    if keys:
+        keys = [k.strip() for k in keys.split(",") if k.strip()]
+    else:
+        keys = [k for k in (os.getenv("GEMINI_API_KEY"), os.getenv("GEMINI_KEY_2")) if k]
+    if not keys and os.getenv("LLM_BACKEND") in ("replay", "synthetic"):
+        # Offline backends ignore the key, but the scheduler still needs one budget to schedule against.
+        keys = ["offline"]
+    return keys
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+class RateWindow:
+    """
+    Sliding-window limiter: never grants more than `per_minute` within any `window` seconds.
+
+    Unlike a token bucket sized to the quota, which can grant a full bucket
+    plus a minute of refill inside one minute, this keeps a log of what was
+    granted and waits for the oldest grants to age out. A single request
+    larger than the whole quota is let through on an empty window.
+    """
+
+    def __init__(self, per_minute, window=60.0):
+        self.limit = float(per_minute)
+        self.window = window
+        self._granted = deque()  # (time, amount)
+        self._used = 0.0
+        self._blocked_until = float("-inf")
+
+    def _expire(self, now):
+        while self._granted and self._granted[0][0] <= now - self.window:
+            self._used -= self._granted.popleft()[1]
+
+    def wait_time(self, amount, now):
+        self._expire(now)
+        amount = min(amount, self.limit)
+        blocked = max(0.0, self._blocked_until - now)
+        excess = self._used + amount - self.limit
+        if excess <= 1e-9:
+            return blocked
+        for granted_at, granted in self._granted:
+            excess -= granted
+            if excess <= 1e-9:
+                return max(blocked, granted_at + self.window - now)
+        return blocked
+
+    def take(self, amount, now):
+        self._granted.append((now, amount))
+        self._used += amount
+
+    def drain(self, seconds, now=None):
+        # After a 429 the server's view of our budget is tighter than ours; back off this key.
+        now = time.monotonic() if now is None else now
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class KeyBudget:
+    """Request and token budgets for one key; without limits the key is never throttled."""
+
+    def __init__(self, api_key, requests_per_minute=None, tokens_per_minute=None):
+        self.api_key = api_key
+        self.limited = requests_per_minute is not None
+        if self.limited:
+            self.requests = RateWindow(requests_per_minute)
+            self.tokens = RateWindow(tokens_per_minute)
+
+    def wait_time(self, cost, now):
+        if not self.limited:
+            return 0.0
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(cost, now))
+
+    def take(self, cost, now):
+        if self.limited:
+            self.requests.take(1, now)
+            self.tokens.take(cost, now)
+
+
+class LLMScheduler:
+    """
+    Spreads Gemini audit calls across a pool of API keys without exceeding per-key quotas.
+
+    Each key has sliding-window limits for requests and tokens per minute. Requests are
+    served in priority order (INTERACTIVE before BULK), each is sent with the
+    key that has budget soonest, and transient failures are retried with
+    jittered exponential backoff on the next available key.
+
+    Workers wait for key budget before taking a request, and retries go back
+    on the queue rather than sleeping in a worker, so a backlog of BULK work
+    held up by rate limits never sits in front of a new INTERACTIVE request.
+    """
+
+    def __init__(self, api_keys=None, requests_per_minute=None, tokens_per_minute=None,
+                 workers=4, max_retries=5, base_delay=1.0, max_delay=60.0, expected_output_tokens=2048):
+        api_keys = api_keys or load_api_keys()
+        if not api_keys:
+            raise ValueError("No Gemini API keys configured")
+        if requests_per_minute is None and tokens_per_minute is None and not get_backend().rate_limited:
+            # Replay and synthetic backends never reach the API, so there is no quota to respect.
+            self.budgets = [KeyBudget(key) for key in api_keys]
+        else:
+            rpm = requests_per_minute or float(os.getenv("GEMINI_RPM", "2"))
+            tpm = tokens_per_minute or float(os.getenv("GEMINI_TPM", "32000"))
+            self.budgets = [KeyBudget(key, rpm, tpm) for key in api_keys]
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.expected_output_tokens = expected_output_tokens
+        self._ready = []    # (priority, seq, prompt, cost, future, attempt)
+        self._delayed = []  # (not_before, seq, item) for retries that are backing off
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"llm-scheduler-{i}", daemon=True).start()
+
+    def submit(self, contract_code, priority=INTERACTIVE):
+        """Queues an audit and returns a Future resolving to analyze_smart_contract's result format."""
+        future = Future()
+        prompt = build_prompt(contract_code)
+        cost = estimate_tokens(prompt) + self.expected_output_tokens
+        with self._changed:
+            heapq.heappush(self._ready, (priority, next(self._seq), prompt, cost, future, 0))
+            self._changed.notify()
+        return future
+
+    def analyze(self, contract_code, priority=INTERACTIVE):
+        return self.submit(contract_code, priority).result()
+
+    def _retry_later(self, item, delay):
+        with self._changed:
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), item))
+            self._changed.notify()
+
+    def _take(self):
+        """
+        Blocks until the highest-priority ready request can be sent, then
+        charges a key's budget for it and returns (item, budget).
+        """
+        with self._changed:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    heapq.heappush(self._ready, heapq.heappop(self._delayed)[2])
+                while self._ready and self._ready[0][4].cancelled():
+                    heapq.heappop(self._ready)
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                if self._ready:
+                    cost = self._ready[0][3]
+                    wait, index = min((b.wait_time(cost, now), i) for i, b in enumerate(self.budgets))
+                    if wait == 0:
+                        budget = self.budgets[index]
+                        budget.take(cost, now)
+                        return heapq.heappop(self._ready), budget
+                    timeout = min(wait, timeout if timeout is not None else wait, self.max_delay)
+                # Also woken by submit(), so a new INTERACTIVE request is considered straight away.
+                self._changed.wait(timeout)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _run(self):
+        while True:
+            item, budget = self._take()
+            priority, _, prompt, cost, future, attempt = item
+            if attempt == 0 and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(parse_analysis(generate_analysis_text(prompt, budget.api_key)))
+            except Exception as e:
+                if not is_transient(e) or attempt == self.max_retries:
+                    future.set_result({"error": str(e)})
+                    continue
+                delay = self._backoff(attempt)
+                logger.warning("Transient LLM error (attempt %d, retry in %.1fs): %s", attempt + 1, delay, e)
+                retry = (priority, next(self._seq), prompt, cost, future, attempt + 1)
+                if is_rate_limit(e) and budget.limited:
+                    # Rest only this key; the retry can go straight to another one.
+                    with self._changed:
+                        budget.requests.drain(delay)
+                    self._retry_later(retry, 0)
+                else:
+                    self._retry_later(retry, delay)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from pathlib import Path
+
+    parser = argparse.ArgumentParser(description="Bulk-audit .sol files through the key pool")
+    parser.add_argument("contracts_dir")
+    parser.add_argument("--out", default="audits.jsonl")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    scheduler = LLMScheduler(workers=args.workers)
+    paths = sorted(Path(args.contracts_dir).rglob("*.sol"))
+    futures = [(p, scheduler.submit(p.read_text(encoding="utf-8"), priority=BULK)) for p in paths]
+    start = time.time()
+    with open(args.out, "w") as f:
+        for path, future in futures:
+            f.write(json.dumps({"path": str(path), "analysis": future.result()}) + "\n")
+    elapsed = time.time() - start
+    print(f"Audited {len(paths)} contracts in {elapsed:.1f}s ({len(paths) / elapsed * 60:.1f}/min)")
@@ -75,15 +75,65 @@
 #     import uvicorn
 #     uvicorn.run(app, host="0.0.0.0", port=8000)
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from predictor import CodeRiskPredictor
-from typing import Optional
-import random as rd
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, Field
+from model_bundles import ModelRegistry
+from jobs import DEPTHS, JobStore, JobWorkerPool, content_hash
+from gem import generate_readable_report
+from llm_scheduler import LLMScheduler, load_api_keys, INTERACTIVE
+from predictor import CodeBERTFeatureExtractor, load_feature_extractor
+from analysis_cache import AnalysisCache
+from incremental import IncrementalAnalyzer
+from project_ingest import ProjectAnalyzer, normalize_paths
+from attribution import FunctionAttributor
+from early_exit import EarlyExitScorer, load_heads
+from results_store import ResultsStore
+from inference_profiles import apply_profile, load_profile, prepare_extractor
+from findings_table import model_score_band
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
 from fastapi.middleware.cors import CORSMiddleware
-import math
+import os
+import threading
+import zlib
+
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", str(16 * 1024 * 1024)))
+
+class GzipRequest(Request):
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.getlist("Content-Encoding"):
+                # Stop inflating past the cap so a small gzip bomb cannot exhaust memory.
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                body = decompressor.decompress(body, MAX_DECOMPRESSED_BYTES + 1)
+                if len(body) > MAX_DECOMPRESSED_BYTES:
+                    raise HTTPException(status_code=413, detail="Decompressed request body too large")
+            self._body = body
+        return self._body
+
+class GzipRoute(APIRoute):
+    # Lets clients send large contracts with Content-Encoding: gzip.
+    def get_route_handler(self):
+        original_route_handler = super().get_route_handler()
+
+        async def custom_route_handler(request: Request):
+            return await original_route_handler(GzipRequest(request.scope, request.receive))
+
+        return custom_route_handler
+
+# Thread settings only take effect before torch does any work, so the profile
+# is applied before the registry loads and warms the classifier.
+inference_profile = load_profile(os.getenv("INFERENCE_PROFILES_PATH", "inference_profiles.json"))
+if inference_profile:
+    apply_profile(inference_profile)
+
 app = FastAPI()
-predictor = CodeRiskPredictor("model_artifacts")
+app.router.route_class = GzipRoute
+registry = ModelRegistry(os.getenv("MODEL_BUNDLES_DIR", "model_bundles"), legacy_artifacts_dir="model_artifacts")
+results_store = ResultsStore(os.getenv("RESULTS_DB_PATH", "results.db"))
 
 app.add_middleware(
     CORSMiddleware,
@@ -93,11 +143,6 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-def get_weighted_score():
-    decay_factor = 0.2  # Closer to 1 = stronger decay
-    weighted_random = 0.6 + (0.6 * (1 - math.exp(-decay_factor * rd.random())))
-    return weighted_random
-
 @app.get("/")
 def home():
     return {"message": "Smart Contract Risk Prediction API is running"}
@@ -106,19 +151,350 @@ class CodeInput(BaseModel):
     code: str
     contract_name: Optional[str] = None
 
+def score_contract(code):
+    features = get_feature_extractor().extract(code)
+    # The lease keeps the model alive until this request is done, even if a swap happens meanwhile.
+    with registry.acquire() as served:
+        risk_score = float(served.predictor.predict(features)[0][0])
+        return {
+            "risk_score": risk_score,
+            "interpretation": f"{model_score_band(risk_score)} risk",
+            "model_version": served.version
+        }
+
 @app.post("/predict")
-async def predict(request: CodeInput):
+def predict(request: CodeInput):
     try:
         if len(request.code) < 20:
             raise HTTPException(status_code=422, detail="Code too short (min 20 chars)")
         
-        return {
-            "risk_score": get_weighted_score(), 
-            "interpretation": "Sample response"
-        }
+        result = score_contract(request.code)
+        results_store.record(
+            content_hash(request.code),
+            "predict",
+            risk_score=result["risk_score"],
+            model_version=result["model_version"],
+            contract_name=request.contract_name
+        )
+        return result
         
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+# Guards the lazily built singletons below; job workers and threadpool endpoints
+# may ask for them at the same time, and two schedulers would double the key quota.
+_singleton_lock = threading.RLock()
+_llm_scheduler = None
+
+def get_llm_scheduler():
+    global _llm_scheduler
+    if _llm_scheduler is None:
+        with _singleton_lock:
+            if _llm_scheduler is None:
+                if not load_api_keys():
+                    raise RuntimeError("Gemini API key not configured")
+                _llm_scheduler = LLMScheduler(workers=int(os.getenv("LLM_WORKERS", "4")))
+    return _llm_scheduler
+
+def audit_contract(code, contract_name=None, priority=INTERACTIVE):
+    analysis = get_llm_scheduler().analyze(code, priority)
+    if isinstance(analysis, dict) and "error" in analysis:
+        raise RuntimeError(analysis["error"])
+    return {
+        "report": generate_readable_report(analysis),
+        "raw_analysis": analysis if isinstance(analysis, list) else []
+    }
+
+def record_job_result(job, result):
+    score = result.get("score", {})
+    audit = result.get("audit")
+    results_store.record(
+        job["content_hash"],
+        f"job:{job['depth']}",
+        risk_score=score.get("risk_score"),
+        model_version=score.get("model_version"),
+        contract_name=job["contract_name"],
+        findings=audit["raw_analysis"] if audit else None
+    )
+
+job_store = JobStore(os.getenv("JOBS_DB_PATH", "jobs.db"))
+job_workers = JobWorkerPool(
+    job_store,
+    handlers={
+        "score": lambda code, contract_name: score_contract(code),
+        "audit": audit_contract
+    },
+    concurrency=int(os.getenv("JOB_WORKERS", "2")),
+    on_complete=record_job_result
+)
+
+@app.on_event("startup")
+def start_job_workers():
+    job_workers.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_workers.stop()
+
+class JobInput(CodeInput):
+    depth: Literal["score", "audit", "both"] = "score"
+    force: bool = False
+
+@app.post("/jobs", status_code=202)
+def submit_job(request: JobInput):
+    if len(request.code) < 20:
+        raise HTTPException(status_code=422, detail="Code too short (min 20 chars)")
+    job, created = job_store.submit(
+        request.code,
+        request.depth,
+        request.contract_name,
+        model_version=registry.current_version if "score" in DEPTHS[request.depth] else None,
+        force=request.force
+    )
+    if created:
+        job_workers.notify()
+    return {"job_id": job["id"], "status": job["status"], "deduplicated": not created}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+_feature_extractor = None
+
+def get_feature_extractor():
+    global _feature_extractor
+    if _feature_extractor is None:
+        with _singleton_lock:
+            if _feature_extractor is None:
+                extractor = load_feature_extractor(os.getenv("ENCODER_BACKEND", "codebert"))
+                if inference_profile:
+                    prepare_extractor(inference_profile, extractor)
+                _feature_extractor = extractor
+    return _feature_extractor
+
+analysis_cache = AnalysisCache(os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.db"))
+
+class IncrementalInput(BaseModel):
+    code: str
+    contract_name: str
+    findings: bool = False
+
+@app.post("/analyze/incremental")
+def analyze_incremental(request: IncrementalInput):
+    if len(request.code) < 20:
+        raise HTTPException(status_code=422, detail="Code too short (min 20 chars)")
+    try:
+        analyzer = IncrementalAnalyzer(
+            get_feature_extractor(),
+            analysis_cache,
+            get_llm_scheduler() if request.findings else None
+        )
+        result = analyzer.analyze(request.code, request.contract_name, with_findings=request.findings)
+        with registry.acquire() as served:
+            risk_score = float(served.predictor.predict(result.pop("features"))[0][0])
+            result.update(risk_score=risk_score, model_version=served.version)
+        results_store.record(
+            content_hash(request.code),
+            "incremental",
+            risk_score=risk_score,
+            model_version=result["model_version"],
+            contract_name=request.contract_name,
+            findings=result["findings"] if request.findings else None
+        )
+        return result
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+_attributor = None
+
+class AttributionInput(CodeInput):
+    budget_ms: float = Field(2000, gt=0)
+    max_variants: int = Field(32, ge=1, le=256)
+
+@app.post("/predict/attribution")
+def predict_attribution(request: AttributionInput):
+    global _attributor
+    if len(request.code) < 20:
+        raise HTTPException(status_code=422, detail="Code too short (min 20 chars)")
+    if _attributor is None:
+        with _singleton_lock:
+            if _attributor is None:
+                _attributor = FunctionAttributor(get_feature_extractor(), analysis_cache)
+    with registry.acquire() as served:
+        result = _attributor.attribute(
+            request.code,
+            served.predictor,
+            budget_ms=request.budget_ms,
+            max_variants=request.max_variants
+        )
+        result["model_version"] = served.version
+    results_store.record(
+        content_hash(request.code),
+        "attribution",
+        risk_score=result["risk_score"],
+        model_version=result["model_version"],
+        contract_name=request.contract_name
+    )
+    return result
+
+_early_exit = None
+
+def get_early_exit_scorer():
+    global _early_exit
+    if _early_exit is not None:
+        return _early_exit
+    with _singleton_lock:
+        if _early_exit is None:
+            heads_dir = os.getenv("EARLY_EXIT_HEADS", "model_artifacts/exit_heads")
+            if not os.path.exists(os.path.join(heads_dir, "exit_heads.json")):
+                raise HTTPException(status_code=503, detail="Early-exit heads not trained")
+            extractor = get_feature_extractor()
+            if not isinstance(extractor, CodeBERTFeatureExtractor):
+                raise HTTPException(status_code=503, detail="Early exit needs the codebert encoder backend")
+            heads, config = load_heads(heads_dir)
+            _early_exit = (EarlyExitScorer(extractor, heads, config["threshold"]), config["model_version"])
+    return _early_exit
+
+@app.post("/predict/adaptive")
+def predict_adaptive(request: CodeInput):
+    if len(request.code) < 20:
+        raise HTTPException(status_code=422, detail="Code too short (min 20 chars)")
+    scorer, heads_version = get_early_exit_scorer()
+    with registry.acquire() as served:
+        # Heads imitate one specific final classifier; after a swap they no longer apply.
+        result = scorer.score(request.code, served.predictor, allow_exit=served.version == heads_version)
+        result["model_version"] = served.version
+    results_store.record(
+        content_hash(request.code),
+        "adaptive",
+        risk_score=result["risk_score"],
+        model_version=result["model_version"],
+        contract_name=request.contract_name
+    )
+    return result
+
+@app.get("/stats/early-exit")
+def early_exit_stats():
+    scorer, heads_version = get_early_exit_scorer()
+    return dict(scorer.stats.summary(), threshold=scorer.threshold, heads_model_version=heads_version)
+
+class ProjectInput(BaseModel):
+    files: Dict[str, str]
+    entry_points: Optional[List[str]] = None
+    remappings: Optional[Dict[str, str]] = None
+    findings: bool = False
+
+@app.post("/projects")
+def analyze_project(request: ProjectInput):
+    if not request.files:
+        raise HTTPException(status_code=422, detail="No files uploaded")
+    try:
+        analyzer = ProjectAnalyzer(
+            get_feature_extractor(),
+            analysis_cache,
+            get_llm_scheduler() if request.findings else None
+        )
+        with registry.acquire() as served:
+            result = analyzer.analyze(
+                request.files,
+                served.predictor,
+                entry_points=request.entry_points,
+                remappings=request.remappings,
+                with_findings=request.findings
+            )
+            result["model_version"] = served.version
+        files = normalize_paths(request.files)
+        for item in result["files"]:
+            audited = request.findings and not item["findings_pending"]
+            results_store.record(
+                content_hash(files[item["path"]]),
+                "project",
+                risk_score=item["risk_score"],
+                model_version=result["model_version"],
+                contract_name=item["path"],
+                findings=item["findings"] if audited else None
+            )
+        return result
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def result_filters(contract_name, model_version, min_score, max_score, since, until, min_critical, min_high):
+    return {
+        "contract_name": contract_name,
+        "model_version": model_version,
+        "min_score": min_score,
+        "max_score": max_score,
+        "since": since.timestamp() if since else None,
+        "until": until.timestamp() if until else None,
+        "min_critical": min_critical,
+        "min_high": min_high
+    }
+
+@app.get("/results")
+def list_results(
+    contract_name: Optional[str] = None,
+    model_version: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_critical: Optional[int] = None,
+    min_high: Optional[int] = None,
+    order_by: str = "created_at",
+    descending: bool = True,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+):
+    filters = result_filters(contract_name, model_version, min_score, max_score, since, until, min_critical, min_high)
+    try:
+        return results_store.query(limit=limit, offset=offset, order_by=order_by, descending=descending, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.get("/results/export")
+def export_results(
+    format: Literal["csv", "jsonl"] = "jsonl",
+    contract_name: Optional[str] = None,
+    model_version: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_critical: Optional[int] = None,
+    min_high: Optional[int] = None
+):
+    filters = result_filters(contract_name, model_version, min_score, max_score, since, until, min_critical, min_high)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        results_store.export(format, **filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=results.{format}"}
+    )
+
+@app.get("/results/{content_hash}")
+def result_history(content_hash: str, limit: int = Query(50, ge=1, le=1000), offset: int = Query(0, ge=0)):
+    history = results_store.query(limit=limit, offset=offset, content_hash=content_hash)
+    if not history["total"]:
+        raise HTTPException(status_code=404, detail="No results for this contract")
+    return history
+
+@app.get("/models")
+def list_models():
+    return registry.status()
+
+@app.post("/models/{version}/activate", status_code=202)
+def activate_model(version: str):
+    if version not in registry.available_versions():
+        raise HTTPException(status_code=404, detail=f"Unknown model version {version}")
+    try:
+        registry.swap_in_background(version)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"loading_version": version, "current_version": registry.current_version}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import torch
+from safetensors.torch import save_file
+
+from predictor import CodeRiskPredictor
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+WEIGHTS_NAME = "model.safetensors"
+CURRENT_POINTER = "CURRENT"
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_bundle(artifacts_dir, bundles_dir, version, feature_spec=None):
+    """
+    Converts legacy pickle/.pth artifacts into a versioned bundle.
+
+    The classifier and temperature weights are merged into one safetensors
+    file so they can be memory-mapped at load time instead of unpickled.
+
+    Args:
+        artifacts_dir (str): Directory with model_config.pkl, model_weights.pth, temperature_scaling.pth
+        bundles_dir (str): Root directory holding one sub-directory per version
+        version (str): Version label for the new bundle
+        feature_spec (dict): Description of the features the model expects
+
+    Returns:
+        Path: The bundle directory
+    """
+    artifacts_dir = Path(artifacts_dir)
+    bundle_dir = Path(bundles_dir) / version
+    if bundle_dir.exists():
+        raise FileExistsError(f"Bundle {version} already exists in {bundles_dir}")
+    bundle_dir.mkdir(parents=True)
+
+    with open(artifacts_dir / "model_config.pkl", "rb") as f:
+        config = pickle.load(f)
+    state = torch.load(artifacts_dir / "model_weights.pth", map_location="cpu")
+    temperature = torch.load(artifacts_dir / "temperature_scaling.pth", map_location="cpu")
+    state.update({f"temperature.{k}": v for k, v in temperature.items()})
+    save_file({k: v.contiguous() for k, v in state.items()}, str(bundle_dir / WEIGHTS_NAME))
+
+    manifest = {
+        "version": version,
+        "created_at": int(time.time()),
+        "input_dim": int(config["input_dim"]),
+        "feature_spec": feature_spec or {
+            "encoder": "microsoft/codebert-base",
+            "pooling": "cls",
+            "max_length": 512,
+            "pad_to": int(config["input_dim"]),
+        },
+        "files": {WEIGHTS_NAME: sha256_file(bundle_dir / WEIGHTS_NAME)},
+    }
+    with open(bundle_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return bundle_dir
+
+
+def read_manifest(bundle_dir):
+    with open(Path(bundle_dir) / MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    for name, expected in manifest["files"].items():
+        actual = sha256_file(Path(bundle_dir) / name)
+        if actual != expected:
+            raise ValueError(f"Checksum mismatch for {name} in bundle {manifest['version']}")
+    return manifest
+
+
+class ServedModel:
+    def __init__(self, version, predictor, manifest=None):
+        self.version = version
+        self.predictor = predictor
+        self.manifest = manifest or {}
+        self.in_flight = 0
+
+
+class ModelRegistry:
+    """
+    Holds the model currently serving traffic and swaps in new versions without downtime.
+
+    Requests take a lease on the current model via `acquire()`; a swap only
+    replaces the reference, so requests already holding the old model finish on it.
+    """
+
+    def __init__(self, bundles_dir, legacy_artifacts_dir=None):
+        self.bundles_dir = Path(bundles_dir)
+        self._lock = threading.Lock()
+        self._current = None
+        self._loading = None
+        self.last_error = None
+
+        version = self.active_version_on_disk()
+        if version:
+            self._current = self._load(version)
+        elif legacy_artifacts_dir:
+            self._current = ServedModel("legacy", CodeRiskPredictor(legacy_artifacts_dir))
+        else:
+            raise FileNotFoundError(f"No active bundle in {bundles_dir} and no legacy artifacts given")
+
+    def active_version_on_disk(self):
+        pointer = self.bundles_dir / CURRENT_POINTER
+        if pointer.exists():
+            return pointer.read_text().strip() or None
+        return None
+
+    def available_versions(self):
+        if not self.bundles_dir.exists():
+            return []
+        return sorted(p.name for p in self.bundles_dir.iterdir() if (p / MANIFEST_NAME).exists())
+
+    @property
+    def current_version(self):
+        return self._current.version
+
+    def status(self):
+        return {
+            "current_version": self._current.version,
+            "in_flight": self._current.in_flight,
+            "loading_version": self._loading,
+            "available_versions": self.available_versions(),
+            "last_error": self.last_error,
+        }
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            served = self._current
+            served.in_flight += 1
+        try:
+            yield served
+        finally:
+            with self._lock:
+                served.in_flight -= 1
+
+    def _load(self, version):
+        bundle_dir = self.bundles_dir / version
+        manifest = read_manifest(bundle_dir)
+        predictor = CodeRiskPredictor.from_bundle(bundle_dir, manifest)
+        # Warm the model so the first real request doesn't pay for lazy init.
+        predictor.predict(torch.zeros(2, manifest["input_dim"]))
+        return ServedModel(version, predictor, manifest)
+
+    def swap(self, version):
+        """Loads and warms `version`, then atomically makes it the serving model."""
+        served = self._load(version)
+        with self._lock:
+            previous, self._current = self._current, served
+        tmp = self.bundles_dir / (CURRENT_POINTER + ".tmp")
+        tmp.write_text(version)
+        os.replace(tmp, self.bundles_dir / CURRENT_POINTER)
+        logger.info("Switched model from %s to %s", previous.version, version)
+        return previous.version
+
+    def swap_in_background(self, version):
+        with self._lock:
+            if self._loading:
+                raise RuntimeError(f"Version {self._loading} is already loading")
+            self._loading = version
+
+        def run():
+            try:
+                self.swap(version)
+                self.last_error = None
+            except Exception as e:
+                logger.exception("Failed to load model version %s", version)
+                self.last_error = f"{version}: {e}"
+            finally:
+                with self._lock:
+                    self._loading = None
+
+        thread = threading.Thread(target=run, name=f"model-load-{version}", daemon=True)
+        thread.start()
+        return thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export legacy artifacts as a versioned bundle")
+    parser.add_argument("version")
+    parser.add_argument("--artifacts-dir", default="model_artifacts")
+    parser.add_argument("--bundles-dir", default="model_bundles")
+    args = parser.parse_args()
+    print(f"Bundle written to {export_bundle(args.artifacts_dir, args.bundles_dir, args.version)}")
@@ -1,30 +1,90 @@
 import torch
 import pickle
+import logging
 import numpy as np
 from pathlib import Path
 from model_definitions import ImprovedCodeBERTClassifier
 from transformers import AutoTokenizer, AutoModel
+from safetensors.torch import load_file
+
+logger = logging.getLogger(__name__)
+
+_inference_profile = None
+
+def set_inference_profile(profile):
+    """Sets the InferenceProfile (see inference_profiles.py) used by every extractor and predictor."""
+    global _inference_profile
+    _inference_profile = profile
+
+def inference_context():
+    if _inference_profile is None:
+        return torch.no_grad()
+    return _inference_profile.context()
+
+
+def pad_features(embeddings):
+    return np.pad(embeddings, ((0, 0), (0, 6)), mode='constant')  # 768 -> 774
+
 
 class CodeBERTFeatureExtractor:
     def __init__(self, model_name="microsoft/codebert-base"):
+        self.name = model_name
         self.tokenizer = AutoTokenizer.from_pretrained(model_name)
         self.model = AutoModel.from_pretrained(model_name)
         self.model.eval()
 
     def extract(self, code_snippet):
         tokens = self.tokenizer(code_snippet, return_tensors="pt", padding=True, truncation=True, max_length=512)
-        with torch.no_grad():
+        with inference_context():
             outputs = self.model(**tokens)
-        embeddings = outputs.last_hidden_state[:, 0, :].squeeze().numpy().reshape(1, -1)
+        embeddings = outputs.last_hidden_state[:, 0, :].squeeze().float().numpy().reshape(1, -1)
     
-        padded_features = np.pad(embeddings, ((0, 0), (0, 6)), mode='constant')  # Now (1, 774)
+        padded_features = pad_features(embeddings)  # Now (1, 774)
         return padded_features
 
+    def embed_batch(self, code_snippets, batch_size=16):
+        """Returns unpadded CLS embeddings, shape (len(code_snippets), hidden_size), encoding in batches."""
+        batches = []
+        for start in range(0, len(code_snippets), batch_size):
+            tokens = self.tokenizer(code_snippets[start:start + batch_size], return_tensors="pt",
+                                    padding=True, truncation=True, max_length=512)
+            with inference_context():
+                outputs = self.model(**tokens)
+            batches.append(outputs.last_hidden_state[:, 0, :].float().numpy())
+        if not batches:
+            return np.zeros((0, self.model.config.hidden_size), dtype=np.float32)
+        return np.concatenate(batches)
+
+
+def load_feature_extractor(backend="codebert"):
+    """
+    Builds the encoder backend: "codebert" for the full teacher, or
+    "student:<dir>" for a distilled student saved by distill.py.
+    """
+    if backend == "codebert":
+        return CodeBERTFeatureExtractor()
+    if backend.startswith("student:"):
+        from distill import StudentFeatureExtractor
+        return StudentFeatureExtractor(backend[len("student:"):])
+    raise ValueError(f"Unknown encoder backend {backend!r}")
+
 
 class CodeRiskPredictor:
-    def __init__(self, artifacts_dir):
+    def __init__(self, artifacts_dir=None):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.load_artifacts(artifacts_dir)
+        if artifacts_dir is not None:
+            self.load_artifacts(artifacts_dir)
+
+    @classmethod
+    def from_bundle(cls, bundle_dir, manifest):
+        predictor = cls()
+        predictor.config = {"input_dim": manifest["input_dim"]}
+        predictor.model = ImprovedCodeBERTClassifier(manifest["input_dim"])
+        # safetensors memory-maps the file rather than unpickling it.
+        state = load_file(str(Path(bundle_dir) / "model.safetensors"), device=str(predictor.device))
+        predictor.model.load_state_dict(state)
+        predictor.model.to(predictor.device).eval()
+        return predictor
     
     def load_artifacts(self, artifacts_dir):
         with open(Path(artifacts_dir) / "model_config.pkl", "rb") as f:
@@ -32,20 +92,19 @@ class CodeRiskPredictor:
         self.model = ImprovedCodeBERTClassifier(self.config['input_dim']).to(self.device)
         self.model.load_state_dict(torch.load(Path(artifacts_dir) / "model_weights.pth", map_location=self.device))
         self.model.temperature.load_state_dict(torch.load(Path(artifacts_dir) / "temperature_scaling.pth", map_location=self.device))
-        print("Temperature scaling parameters:", self.model.temperature)
+        logger.info("Temperature scaling parameter: %s", self.model.temperature.temperature.item())
         self.model.eval()
     
     def predict(self, features):
         if not isinstance(features, torch.Tensor):
-            features = torch.tensor(features, dtype=torch.float32).to(self.device)
-        with torch.no_grad():
+            features = torch.tensor(features, dtype=torch.float32)
+        features = features.to(self.device)
+        with inference_context():
             outputs = self.model(features)
-            return torch.sigmoid(outputs).cpu().numpy()
-        
-extractor = CodeBERTFeatureExtractor()
-predictor = CodeRiskPredictor("model_artifacts")
+            return torch.sigmoid(outputs).float().cpu().numpy()
+
 
-code_sample = """// SPDX-License-Identifier: MIT
+CODE_SAMPLE = """// SPDX-License-Identifier: MIT
 pragma solidity ^0.8.0;
 
 contract SimpleStorage {
@@ -61,11 +120,15 @@ contract SimpleStorage {
         return number;
     }
 }"""
-features = extractor.extract(code_sample)
 
-if isinstance(features, np.ndarray):
-    features = torch.tensor(features, dtype=torch.float32)  # Ensure tensor conversion
+if __name__ == "__main__":
+    extractor = CodeBERTFeatureExtractor()
+    predictor = CodeRiskPredictor("model_artifacts")
+
+    features = extractor.extract(CODE_SAMPLE)
 
-risk_score = predictor.predict(features)
-print(risk_score)
+    if isinstance(features, np.ndarray):
+        features = torch.tensor(features, dtype=torch.float32)  # Ensure tensor conversion
 
+    risk_score = predictor.predict(features)
+    print(risk_score)
@@ -0,0 +1,249 @@
+import posixpath
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+from llm_scheduler import BULK, INTERACTIVE
+from predictor import pad_features
+from solidity_units import fingerprint, mask_comments_and_strings
+
+IMPORT_RE = re.compile(r"""\bimport\s+(?:[^"';]*?\bfrom\s+)?["']([^"']+)["']""")
+
+# Paths under these prefixes are shared libraries (npm packages, forge lib/ checkouts).
+DEPENDENCY_PREFIXES = ("node_modules/", "lib/", "@")
+
+DEFAULT_REMAPPINGS = {
+    "@openzeppelin/": "node_modules/@openzeppelin/",
+    "solmate/": "lib/solmate/src/",
+}
+
+
+def resolve_import(importer, target, files, remappings):
+    """
+    Returns the uploaded path `target` refers to, or None.
+
+    Tries the remapped target first, then the target as written, then the
+    remapped path without its node_modules/ or lib/ prefix, since packages
+    are often uploaded in their natural layout (@openzeppelin/contracts/...,
+    solmate/src/...) rather than under node_modules/ or lib/.
+    """
+    candidates = []
+    for prefix in sorted(remappings, key=len, reverse=True):
+        if target.startswith(prefix):
+            candidates.append(remappings[prefix] + target[len(prefix):])
+            break
+    if target.startswith("."):
+        candidates.append(posixpath.join(posixpath.dirname(importer), target))
+    else:
+        candidates.append(target)
+    for candidate in list(candidates):
+        for prefix in ("node_modules/", "lib/"):
+            if candidate.startswith(prefix):
+                candidates.append(candidate[len(prefix):])
+        candidates.append("node_modules/" + candidate)
+    for candidate in candidates:
+        candidate = posixpath.normpath(candidate)
+        if candidate in files:
+            return candidate
+    return None
+
+
+def normalize_paths(files):
+    """Maps upload keys such as ./contracts/A.sol or contracts//A.sol onto clean relative paths."""
+    normalized = {}
+    for path, source in files.items():
+        key = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+        if key in normalized:
+            raise ValueError(f"Duplicate file path after normalisation: {path}")
+        normalized[key] = source
+    return normalized
+
+
+def build_import_graph(files, remappings=None):
+    """
+    Resolves every import statement between the uploaded files.
+
+    Args:
+        files (dict): Path -> Solidity source
+        remappings (dict): Import prefix -> path prefix, like solc remappings
+
+    Returns:
+        tuple: (path -> list of imported paths, list of unresolved {"file", "import"})
+    """
+    files = normalize_paths(files)
+    remappings = dict(DEFAULT_REMAPPINGS, **(remappings or {}))
+    graph, unresolved = {}, []
+    for path, source in files.items():
+        graph[path] = []
+        for target in IMPORT_RE.findall(mask_comments_and_strings(source, strings=False)):
+            resolved = resolve_import(path, target, files, remappings)
+            if resolved:
+                graph[path].append(resolved)
+            else:
+                unresolved.append({"file": path, "import": target})
+    return graph, unresolved
+
+
+def reachable_files(graph, entry_points):
+    seen, queue = set(entry_points), deque(entry_points)
+    while queue:
+        for target in graph[queue.popleft()]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+def is_dependency(path, prefixes=DEPENDENCY_PREFIXES):
+    return path.startswith(prefixes)
+
+
+def dependency_prefixes(remappings=None):
+    """
+    DEPENDENCY_PREFIXES plus both sides of every remapping, so natural-layout
+    uploads (solmate/src/...) and remapped checkouts (vendor/forge-std/src/...)
+    count as dependencies.
+    """
+    remappings = dict(DEFAULT_REMAPPINGS, **(remappings or {}))
+    return DEPENDENCY_PREFIXES + tuple(remappings) + tuple(remappings.values())
+
+
+# Fingerprint -> Future for audits still running, shared by every ProjectAnalyzer
+# so concurrent uploads of the same file wait on one LLM call instead of queuing another.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class ProjectAnalyzer:
+    """
+    Scores a multi-file project, analysing each distinct file content at most once fleet-wide.
+
+    Files are de-duplicated by fingerprint and their embeddings and findings
+    are kept in the shared AnalysisCache, so a library such as OpenZeppelin's
+    ERC20 is only encoded and audited the first time any project uploads it.
+    Dependency audits run in the background at bulk priority: the response
+    marks them pending, and later uploads get their findings from the cache.
+    An upload that needs a file whose audit is still running waits on that
+    audit rather than starting another.
+    The project score is the highest own-file score, or the highest
+    dependency score scaled by `dependency_weight` if that is larger.
+    """
+
+    def __init__(self, extractor, cache, scheduler=None, dependency_weight=0.5):
+        self.extractor = extractor
+        self.cache = cache
+        self.scheduler = scheduler
+        self.dependency_weight = dependency_weight
+
+    def analyze(self, files, predictor, entry_points=None, remappings=None, with_findings=False):
+        files = normalize_paths(files)
+        graph, unresolved = build_import_graph(files, remappings)
+        prefixes = dependency_prefixes(remappings)
+        if entry_points:
+            entry_points = [posixpath.normpath(p).lstrip("/") for p in entry_points]
+            missing = [p for p in entry_points if p not in files]
+            if missing:
+                raise ValueError(f"Entry points not in upload: {', '.join(missing)}")
+            paths = reachable_files(graph, entry_points)
+        else:
+            paths = set(files)
+        paths = sorted(paths)
+
+        hashes = {p: fingerprint(mask_comments_and_strings(files[p], strings=False)) for p in paths}
+        unique = {}
+        for path in paths:
+            unique.setdefault(hashes[path], path)
+
+        embeddings = self.cache.get_embeddings(unique, self.extractor.name)
+        to_encode = [fp for fp in unique if fp not in embeddings]
+        if to_encode:
+            vectors = self.extractor.embed_batch([files[unique[fp]] for fp in to_encode])
+            fresh = dict(zip(to_encode, vectors))
+            self.cache.put_embeddings(fresh, self.extractor.name)
+            embeddings.update(fresh)
+
+        fingerprints = list(unique)
+        scores = predictor.predict(pad_features(np.stack([embeddings[fp] for fp in fingerprints]))).reshape(-1)
+        score_by_hash = dict(zip(fingerprints, scores.tolist()))
+
+        dependency = {p: is_dependency(p, prefixes) for p in paths}
+        findings, audited, background = {}, 0, set()
+        if with_findings:
+            findings, audited, background = self._audit(files, unique, dependency)
+
+        own = [score_by_hash[hashes[p]] for p in paths if not dependency[p]]
+        deps = [score_by_hash[hashes[p]] for p in paths if dependency[p]]
+        project_score = max([max(own, default=0.0), self.dependency_weight * max(deps, default=0.0)])
+
+        return {
+            "project_score": project_score,
+            "files": [
+                {
+                    "path": p,
+                    "content_hash": hashes[p],
+                    "dependency": dependency[p],
+                    "imports": graph[p],
+                    "risk_score": score_by_hash[hashes[p]],
+                    "findings": findings.get(hashes[p], []),
+                    "findings_pending": hashes[p] in background,
+                }
+                for p in paths
+            ],
+            "unresolved_imports": unresolved,
+            "stats": {
+                "files": len(paths),
+                "unique_files": len(unique),
+                "encoded_files": len(to_encode),
+                "audited_files": audited,
+                "pending_audits": len(background),
+            },
+        }
+
+    def _audit(self, files, unique, dependency):
+        """
+        Returns (fingerprint -> findings, files audited for this request, fingerprints audited in the background).
+        """
+        if self.scheduler is None:
+            raise RuntimeError("File findings need an LLM scheduler")
+        findings = self.cache.get_findings(unique)
+        waiting, background = {}, set()
+        for fp, path in unique.items():
+            if fp in findings:
+                continue
+            future = self._submit(fp, files[path], BULK if dependency[path] else INTERACTIVE)
+            if dependency[path]:
+                background.add(fp)
+            else:
+                waiting[fp] = future
+        # Fresh results are cached by the done callback registered in _submit.
+        for fp, future in waiting.items():
+            result = future.result()
+            if isinstance(result, dict) and "error" in result:
+                raise RuntimeError(result["error"])
+            findings[fp] = result if isinstance(result, list) else []
+        return findings, len(waiting), background
+
+    def _submit(self, fp, source, priority):
+        """Returns the running audit of `fp` if there is one, otherwise starts it."""
+        with _in_flight_lock:
+            future = _in_flight.get(fp)
+            if future is not None:
+                return future
+            future = _in_flight[fp] = self.scheduler.submit(source, priority)
+        # Registered outside the lock: the callback runs straight away if the audit already finished.
+        future.add_done_callback(lambda f: self._finish(fp, f))
+        return future
+
+    def _finish(self, fp, future):
+        # Cache before forgetting the future so a concurrent upload sees one or the other.
+        self._store_findings(fp, future.result())
+        with _in_flight_lock:
+            if _in_flight.get(fp) is future:
+                del _in_flight[fp]
+
+    def _store_findings(self, fp, result):
+        # Unparseable or failed audits are not cached so the next upload retries them.
+        if isinstance(result, list):
+            self.cache.put_findings({fp: result})
@@ -3,6 +3,7 @@ import os
 import json
 import re
 from dotenv import load_dotenv
+from findings_table import DEFAULT_POLICY, severity_code, severity_counts as count_severities
 
 load_dotenv()
 
@@ -84,36 +85,15 @@ def calculate_risk_score(vulnerabilities):
     """
     Calculate a risk score between 0-1 based on the vulnerabilities found.
     
+    Severity weights come from the shared ScoringPolicy in findings_table.py.
+    
     Args:
         vulnerabilities: List of vulnerability objects
         
     Returns:
         float: Risk score between 0-1
     """
-    severity_weights = {
-        "Critical": 0.4,
-        "High": 0.25,
-        "Medium": 0.2,
-        "Low": 0.1,
-        "N/A": 0
-    }
-    
-    total_score = 0
-    max_score = 0
-    
-    for vuln in vulnerabilities:
-        severity = vuln.get("severity", "N/A")
-        if severity in severity_weights:
-            total_score += severity_weights[severity]
-            max_score += 0.4  # Maximum possible weight (Critical)
-    
-    # Normalize to 0-1 scale
-    if max_score > 0:
-        normalized_score = min(total_score, 1.0)
-    else:
-        normalized_score = 0
-        
-    return round(normalized_score, 2)
+    return round(DEFAULT_POLICY.score(vulnerabilities), 2)
 
 def generate_readable_report(analysis_results):
     """
@@ -137,6 +117,7 @@ def generate_readable_report(analysis_results):
     
     # Calculate risk score
     risk_score = calculate_risk_score(vulnerabilities)
+    band = DEFAULT_POLICY.band(risk_score)
     
     # Start building the report
     report = "SMART CONTRACT SECURITY ANALYSIS REPORT\n"
@@ -146,20 +127,14 @@ def generate_readable_report(analysis_results):
     report += f"RISK ASSESSMENT SCORE: {risk_score}/1.0\n\n"
    
     # Count vulnerabilities by severity
-    severity_counts = {"Critical": 0, "High": 0, "Medium": 0, "Low": 0}
-    real_vulnerabilities = []
-    
-    for vuln in vulnerabilities:
-        severity = vuln.get("severity", "N/A")
-        if severity in severity_counts and severity != "N/A":
-            severity_counts[severity] += 1
-            real_vulnerabilities.append(vuln)
+    severity_counts = count_severities(vulnerabilities)
+    real_vulnerabilities = [vuln for vuln in vulnerabilities if severity_code(vuln.get("severity")) > 0]
 
-    if risk_score >= 0.7:
+    if band == "critical":
         report += "The analyzed smart contract contains serious security vulnerabilities that require immediate attention. DO NOT deploy this contract until these issues have been fixed and verified.\n"
-    elif risk_score >= 0.4:
+    elif band == "significant":
         report += "The analyzed smart contract contains notable security concerns. It is recommended to address these issues before deploying this contract to a production environment.\n"
-    elif risk_score >= 0.2:
+    elif band == "moderate":
         report += "The analyzed smart contract contains some minor security concerns. While not critical, addressing these issues would improve the overall security posture of the contract.\n"
     else:
         report += "The analyzed smart contract appears to be relatively secure with only minor issues identified. As with any smart contract, continue to follow security best practices and consider a professional audit before major deployments.\n"
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from findings_table import severity_counts
+from jobs import content_hash
+
+SEVERITIES = ("critical", "high", "medium", "low")
+
+COLUMNS = ("id", "content_hash", "contract_name", "model_version", "risk_score",
+           *SEVERITIES, "source", "created_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT NOT NULL,
+    contract_name TEXT,
+    model_version TEXT,
+    risk_score REAL,
+    critical INTEGER,
+    high INTEGER,
+    medium INTEGER,
+    low INTEGER,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_hash ON results (content_hash, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_name ON results (contract_name, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_version ON results (model_version, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_score ON results (risk_score);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at, risk_score);
+CREATE INDEX IF NOT EXISTS idx_results_critical ON results (critical);
+CREATE INDEX IF NOT EXISTS idx_results_high ON results (high);
+"""
+
+ORDERABLE = {"created_at", "risk_score", "contract_name", "critical", "high", "medium", "low"}
+
+
+class ResultsStore:
+    """
+    Append-only history of scored contracts in SQLite.
+
+    Every score or audit adds a row, so a contract's history is kept across
+    model versions. Queries only read this table and never call the model.
+    """
+
+    def __init__(self, path="results.db"):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, content_hash, source, risk_score=None, model_version=None, contract_name=None, findings=None):
+        """
+        Stores one result. Severity counts are left NULL when no findings were produced.
+
+        Returns:
+            int: Row id
+        """
+        if findings is None:
+            counts = dict.fromkeys(SEVERITIES)
+        else:
+            counts = {name.lower(): count for name, count in severity_counts(findings).items()}
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO results (content_hash, contract_name, model_version, risk_score, "
+                "critical, high, medium, low, source, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (content_hash, contract_name, model_version, risk_score,
+                 counts["critical"], counts["high"], counts["medium"], counts["low"], source, time.time()),
+            )
+            return cursor.lastrowid
+
+    @staticmethod
+    def _where(content_hash=None, contract_name=None, model_version=None, min_score=None, max_score=None,
+               since=None, until=None, min_critical=None, min_high=None):
+        clauses, params = [], []
+        for column, op, value in (
+            ("content_hash", "=", content_hash),
+            ("contract_name", "=", contract_name),
+            ("model_version", "=", model_version),
+            ("risk_score", ">=", min_score),
+            ("risk_score", "<=", max_score),
+            ("created_at", ">=", since),
+            ("created_at", "<", until),
+            ("critical", ">=", min_critical),
+            ("high", ">=", min_high),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, limit=50, offset=0, order_by="created_at", descending=True, **filters):
+        """
+        Lists results matching the filters, newest first by default.
+
+        Filters: content_hash, contract_name, model_version, min_score,
+        max_score, since, until (epoch seconds), min_critical, min_high.
+
+        Returns:
+            dict: {"total": matching rows, "items": one page of rows}
+        """
+        if order_by not in ORDERABLE:
+            raise ValueError(f"Cannot order by {order_by!r}")
+        where, params = self._where(**filters)
+        direction = "DESC" if descending else "ASC"
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM results{where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM results{where} ORDER BY {order_by} {direction}, id {direction} LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return {"total": total, "items": [dict(row) for row in rows]}
+
+    def latest(self, content_hash, model_version=None):
+        page = self.query(limit=1, content_hash=content_hash, model_version=model_version)
+        return page["items"][0] if page["items"] else None
+
+    def export(self, fmt="jsonl", batch_size=5000, **filters):
+        """
+        Yields the matching rows as CSV or JSON Lines text, streamed in batches.
+
+        Each batch is read on its own connection, paging by id, because
+        StreamingResponse may advance this generator from different threads.
+        """
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError(f"Unknown export format {fmt!r}")
+        where, params = self._where(**filters)
+        where += " AND id > ?" if where else " WHERE id > ?"
+        if fmt == "csv":
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(COLUMNS)
+            yield buffer.getvalue()
+        last_id = 0
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM results{where} ORDER BY id LIMIT ?",
+                    (*params, last_id, batch_size),
+                ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+            rows = [tuple(row) for row in rows]
+            if fmt == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
@@ -0,0 +1,171 @@
+import hashlib
+import re
+from dataclasses import dataclass
+
+CONTRACT_RE = re.compile(r"\b(?:abstract\s+contract|contract|interface|library)\s+([A-Za-z_$][\w$]*)[^{;]*\{")
+MEMBER_RE = re.compile(r"\b(function|modifier|constructor|fallback|receive)\b\s*([A-Za-z_$][\w$]*)?")
+DIRECTIVE_RE = re.compile(r"\b(?:pragma|import)\b[^;]*;")
+
+
+@dataclass
+class Unit:
+    """A contract skeleton, function, modifier or file-level code cut out of a source file."""
+    key: str
+    kind: str
+    name: str
+    contract: str
+    source: str
+    start: int
+    end: int
+    fingerprint: str
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "kind": self.kind,
+            "name": self.name,
+            "contract": self.contract,
+            "fingerprint": self.fingerprint,
+        }
+
+
+def mask_comments_and_strings(code, strings=True):
+    """Blanks out comments (and string literals unless `strings` is False), keeping offsets."""
+    out = list(code)
+    i, n = 0, len(code)
+    while i < n:
+        is_string = False
+        if code.startswith("//", i):
+            j = code.find("\n", i)
+            j = n if j == -1 else j
+        elif code.startswith("/*", i):
+            j = code.find("*/", i + 2)
+            j = n if j == -1 else j + 2
+        elif code[i] in "\"'":
+            is_string = True
+            quote, j = code[i], i + 1
+            while j < n and code[j] != quote and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            j = min(j + 1, n)
+        else:
+            i += 1
+            continue
+        if strings or not is_string:
+            for k in range(i, j):
+                if out[k] != "\n":
+                    out[k] = " "
+        i = j
+    return "".join(out)
+
+
+def find_block_end(masked, open_brace):
+    """Returns the offset just past the brace matching the one at `open_brace`."""
+    depth = 0
+    for i in range(open_brace, len(masked)):
+        if masked[i] == "{":
+            depth += 1
+        elif masked[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return len(masked)
+
+
+def normalize(masked_source):
+    return " ".join(masked_source.split())
+
+
+def fingerprint(uncommented_source):
+    # Comments and whitespace are stripped first so edits to them don't count as changes.
+    return hashlib.sha256(normalize(uncommented_source).encode("utf-8")).hexdigest()
+
+
+def split_units(code):
+    """
+    Splits Solidity source into analysable units.
+
+    Each contract yields one "contract" unit holding its skeleton (header,
+    state variables, events, with member bodies removed) plus one unit per
+    function, modifier, constructor, fallback and receive. Declarations
+    outside any contract (free functions, constants, structs, errors) form
+    a leading "file" unit. Units are keyed by contract, kind, name and
+    parameter list so overloads stay distinct.
+
+    Removed code is replaced by its line breaks, so line N of a skeleton or
+    file unit is line N of the file counted from the unit's start.
+
+    Args:
+        code (str): Solidity source
+
+    Returns:
+        list: Unit objects in source order
+    """
+    masked = mask_comments_and_strings(code)
+    uncommented = mask_comments_and_strings(code, strings=False)
+    units = []
+    contracts = []
+    pos = 0
+    while True:
+        match = CONTRACT_RE.search(masked, pos)
+        if not match:
+            break
+        contract = match.group(1)
+        body_start = match.end() - 1
+        body_end = find_block_end(masked, body_start)
+        members = []
+        member_pos = body_start + 1
+        while True:
+            member = MEMBER_RE.search(masked, member_pos, body_end)
+            if not member:
+                break
+            header_end = member.end()
+            while header_end < body_end and masked[header_end] not in "{;":
+                header_end += 1
+            kind = member.group(1)
+            name = member.group(2) if kind in ("function", "modifier") and member.group(2) else kind
+            params = normalize(masked[member.end():header_end]).split(")")[0].lstrip("(")
+            key = f"{contract}.{kind}:{name}({params})"
+            if header_end >= body_end or masked[header_end] == ";":
+                end = header_end + 1  # declaration without a body
+            else:
+                end = find_block_end(masked, header_end)
+            members.append((key, kind, name, member.start(), end))
+            member_pos = end
+
+        skeleton_parts, uncommented_parts, cursor = [], [], match.start()
+        for key, kind, name, start, end in members:
+            skeleton_parts.append(code[cursor:start] + "\n" * code.count("\n", start, end))
+            uncommented_parts.append(uncommented[cursor:start])
+            cursor = end
+        skeleton_parts.append(code[cursor:body_end])
+        uncommented_parts.append(uncommented[cursor:body_end])
+        units.append(Unit(
+            key=f"{contract}.contract", kind="contract", name=contract, contract=contract,
+            source="".join(skeleton_parts), start=match.start(), end=body_end,
+            fingerprint=fingerprint("".join(uncommented_parts)),
+        ))
+        for key, kind, name, start, end in members:
+            units.append(Unit(
+                key=key, kind=kind, name=name, contract=contract,
+                source=code[start:end], start=start, end=end,
+                fingerprint=fingerprint(uncommented[start:end]),
+            ))
+        contracts.append((match.start(), body_end))
+        pos = body_end
+
+    outside_parts, uncommented_parts, masked_parts, cursor = [], [], [], 0
+    for start, end in contracts:
+        outside_parts.append(code[cursor:start] + "\n" * code.count("\n", start, end))
+        uncommented_parts.append(uncommented[cursor:start])
+        masked_parts.append(masked[cursor:start])
+        cursor = end
+    outside_parts.append(code[cursor:])
+    uncommented_parts.append(uncommented[cursor:])
+    masked_parts.append(masked[cursor:])
+    # Pragmas and imports alone are not worth a unit of their own.
+    if DIRECTIVE_RE.sub("", "".join(masked_parts)).strip():
+        units.insert(0, Unit(
+            key="file", kind="file", name="file", contract="", source="".join(outside_parts),
+            start=0, end=len(code), fingerprint=fingerprint("".join(uncommented_parts)),
+        ))
+    return units
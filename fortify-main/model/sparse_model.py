@@ -0,0 +1,185 @@
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+# Solidity identifiers, numbers and runs of operator characters. Keeping
+# operators as tokens lets n-grams pick up patterns like `.call{value:`.
+TOKEN_PATTERN = r"[A-Za-z_$][A-Za-z0-9_$]*|\d+|[{}()\[\];.,:=!<>+\-*/%&|^~?]+"
+
+DEFAULT_FEATURE_SPEC = {
+    "n_features": 2 ** 20,
+    "ngram_range": [1, 3],
+    "token_pattern": TOKEN_PATTERN,
+    "lowercase": False,
+    "norm": "l2",
+}
+
+LABEL_DIRS = {"secure": 0, "vulnerable": 1}
+
+
+def build_vectorizer(feature_spec=None):
+    """
+    Builds the stateless hashing vectorizer described by a feature spec.
+
+    Args:
+        feature_spec (dict): Vectorizer settings, defaults to DEFAULT_FEATURE_SPEC
+
+    Returns:
+        HashingVectorizer: Vectorizer that needs no fitting or vocabulary
+    """
+    spec = dict(DEFAULT_FEATURE_SPEC, **(feature_spec or {}))
+    return HashingVectorizer(
+        n_features=spec["n_features"],
+        ngram_range=tuple(spec["ngram_range"]),
+        token_pattern=spec["token_pattern"],
+        lowercase=spec["lowercase"],
+        norm=spec["norm"],
+        alternate_sign=False,
+        dtype=np.float32,
+    )
+
+
+def list_corpus(corpus_dir):
+    """
+    Lists labelled contract files under `corpus_dir/secure` and `corpus_dir/vulnerable`.
+
+    Only paths are held in memory; file contents are read lazily in chunks.
+    """
+    files = []
+    for name, label in LABEL_DIRS.items():
+        for path in sorted((Path(corpus_dir) / name).rglob("*.sol")):
+            files.append((path, label))
+    return files
+
+
+def iter_chunks(files, chunk_size):
+    """Yields (texts, labels) lists of at most `chunk_size` contracts read from disk."""
+    for start in range(0, len(files), chunk_size):
+        texts, labels = [], []
+        for path, label in files[start:start + chunk_size]:
+            texts.append(path.read_text(encoding="utf-8", errors="ignore"))
+            labels.append(label)
+        yield texts, np.asarray(labels, dtype=np.int8)
+
+
+class SparseRiskModel:
+    def __init__(self, coef, intercept, feature_spec=None):
+        self.feature_spec = dict(DEFAULT_FEATURE_SPEC, **(feature_spec or {}))
+        self.vectorizer = build_vectorizer(self.feature_spec)
+        self.coef = np.asarray(coef, dtype=np.float32).reshape(-1)
+        self.intercept = float(intercept)
+
+    def transform(self, texts):
+        return self.vectorizer.transform(texts)
+
+    def decision_function(self, texts):
+        # CSR matrix times dense vector only touches non-zero hashed n-grams.
+        return self.transform(texts) @ self.coef + self.intercept
+
+    def predict(self, texts):
+        return 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            coef=self.coef,
+            intercept=np.float32(self.intercept),
+            feature_spec=json.dumps(self.feature_spec),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["coef"], data["intercept"], json.loads(str(data["feature_spec"])))
+
+
+def train(corpus_dir, epochs=3, chunk_size=2048, seed=42, feature_spec=None):
+    """
+    Trains a logistic-regression model incrementally over the contract corpus.
+
+    Args:
+        corpus_dir (str): Directory containing `secure/` and `vulnerable/` .sol files
+        epochs (int): Passes over the corpus
+        chunk_size (int): Number of contracts read and fitted per step
+        seed (int): Seed for file shuffling and SGD
+
+    Returns:
+        SparseRiskModel: The trained model
+    """
+    files = list_corpus(corpus_dir)
+    if not files:
+        raise ValueError(f"No .sol files found under {corpus_dir}/secure or {corpus_dir}/vulnerable")
+
+    vectorizer = build_vectorizer(feature_spec)
+    classifier = SGDClassifier(loss="log_loss", alpha=1e-6, random_state=seed)
+    rng = random.Random(seed)
+
+    for epoch in range(epochs):
+        rng.shuffle(files)
+        seen = 0
+        for texts, labels in iter_chunks(files, chunk_size):
+            classifier.partial_fit(vectorizer.transform(texts), labels, classes=np.array([0, 1]))
+            seen += len(texts)
+        print(f"Epoch {epoch + 1}/{epochs}: {seen} contracts")
+
+    return SparseRiskModel(classifier.coef_, classifier.intercept_[0], feature_spec)
+
+
+def benchmark(model, texts, batch_sizes=(1, 64, 1024), repeats=5):
+    """
+    Measures scoring throughput for several batch sizes.
+
+    Returns:
+        list: One dict per batch size with per-contract latency and contracts/sec
+    """
+    results = []
+    for batch_size in batch_sizes:
+        batch = (texts * (batch_size // len(texts) + 1))[:batch_size]
+        model.predict(batch)  # warm up
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model.predict(batch)
+        elapsed = time.perf_counter() - start
+        per_contract = elapsed / (repeats * batch_size)
+        results.append({
+            "batch_size": batch_size,
+            "ms_per_contract": round(per_contract * 1000, 4),
+            "contracts_per_sec": round(1 / per_contract),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hashed n-gram risk model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train")
+    train_cmd.add_argument("corpus_dir")
+    train_cmd.add_argument("--out", default="model_artifacts/sparse_model.npz")
+    train_cmd.add_argument("--epochs", type=int, default=3)
+    train_cmd.add_argument("--chunk-size", type=int, default=2048)
+
+    bench_cmd = sub.add_parser("bench")
+    bench_cmd.add_argument("model_path")
+    bench_cmd.add_argument("sample_dir")
+
+    args = parser.parse_args()
+
+    if args.command == "train":
+        model = train(args.corpus_dir, epochs=args.epochs, chunk_size=args.chunk_size)
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        model.save(args.out)
+        print(f"Model saved to {args.out}")
+    else:
+        model = SparseRiskModel.load(args.model_path)
+        samples = [p.read_text(encoding="utf-8", errors="ignore") for p in Path(args.sample_dir).rglob("*.sol")]
+        if not samples:
+            raise SystemExit(f"No .sol files found under {args.sample_dir}")
+        for row in benchmark(model, samples):
+            print(row)
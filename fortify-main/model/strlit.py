@@ -1,7 +1,15 @@
 import streamlit as st
 import requests
 import json
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
+from findings_table import model_score_band
 
 # ==============================================
 # APP CONFIGURATION
@@ -68,6 +76,8 @@ if 'api_response' not in st.session_state:
     st.session_state.api_response = None
 if 'last_code' not in st.session_state:
     st.session_state.last_code = ""
+if 'pending_job' not in st.session_state:
+    st.session_state.pending_job = None
 
 
 st.markdown('<p class="header">🔒 Smart Contract Risk Analyzer</p>', unsafe_allow_html=True)
@@ -102,10 +112,77 @@ contract Example {
 )
 
 
-API_URL = "http://localhost:8000/predict"
+API_BASE = "http://localhost:8000"
+POLL_INTERVAL = 1.0       # seconds between job status checks
+JOB_TIMEOUT = 600         # give up waiting on a job after this many seconds
+GZIP_THRESHOLD = 32 * 1024  # compress request bodies larger than this
+DEPTHS = {"Risk score": "score", "Risk score + deep LLM audit": "both"}
 
-def analyze_contract(code):
-    """Improved version with better error handling"""
+
+class ResultCache:
+    """Bounded LRU of finished analyses, shared by every session of this Streamlit server."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache()
+
+
+@st.cache_resource
+def get_http_session():
+    """One pooled, keep-alive session reused across reruns and sessions."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=16,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept": "application/json"})
+    return session
+
+
+def post_json(url, payload, timeout=10):
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if len(body) > GZIP_THRESHOLD:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+    return get_http_session().post(url, data=body, headers=headers, timeout=timeout)
+
+
+def validation_error(response):
+    try:
+        detail = response.json().get("detail", "Unknown validation error")
+        if isinstance(detail, list):
+            detail = "; ".join([f"{e['loc'][1]}: {e['msg']}" for e in detail])
+        return {"error": f"Validation error: {detail}"}
+    except Exception:
+        return {"error": "Unprocessable entity (invalid input format)"}
+
+
+def submit_analysis(code, depth):
+    """Submits the contract as a background job and returns the job id, or an error dict."""
     if not code.strip():
         return {"error": "Please enter Solidity code to analyze"}
     
@@ -113,35 +190,95 @@ def analyze_contract(code):
         return {"error": "Code too short (min 20 characters required)"}
     
     try:
-        response = requests.post(
-            API_URL,
-            json={"code": code},
-            headers={
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            },
-            timeout=10
-        )
-        
+        response = post_json(f"{API_BASE}/jobs", {"code": code, "depth": depth})
         if response.status_code == 422:
-            try:
-                detail = response.json().get("detail", "Unknown validation error")
-                if isinstance(detail, list):
-                    detail = "; ".join([f"{e['loc'][1]}: {e['msg']}" for e in detail])
-                return {"error": f"Validation error: {detail}"}
-            except:
-                return {"error": "Unprocessable entity (invalid input format)"}
-                
+            return validation_error(response)
         response.raise_for_status()
-        return response.json()
-        
+        return {"job_id": response.json()["job_id"]}
     except RequestException as e:
         return {"error": f"API request failed: {str(e)}"}
 
 
+def check_job(job_id):
+    """
+    Checks the job once with a short request.
+
+    Returns:
+        tuple: (merged result or error dict, or None while the job is still running; job dict or None)
+    """
+    try:
+        response = get_http_session().get(f"{API_BASE}/jobs/{job_id}", timeout=10)
+        response.raise_for_status()
+        job = response.json()
+    except RequestException as e:
+        return {"error": f"API request failed: {str(e)}"}, None
+    
+    if job["status"] == "done":
+        result = job["result"]
+        merged = dict(result.get("score", {}))
+        merged.update(result.get("audit", {}))
+        return merged, job
+    if job["status"] == "failed":
+        return {"error": f"Analysis failed: {job.get('error')}"}, job
+    return None, job
+
+
+def start_analysis(code, depth="score"):
+    """
+    Returns a cached result when the same code was analyzed before; otherwise
+    submits a background job, records it as pending and returns None.
+    """
+    cache_key = (hashlib.sha256(code.encode("utf-8")).hexdigest(), depth)
+    cached = get_result_cache().get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Keep polling a job this session already submitted instead of submitting it again.
+    pending = st.session_state.pending_job
+    if pending and pending["key"] == cache_key:
+        return None
+    
+    submitted = submit_analysis(code, depth)
+    if "error" in submitted:
+        return submitted
+    st.session_state.pending_job = {
+        "key": cache_key,
+        "job_id": submitted["job_id"],
+        "deadline": time.time() + JOB_TIMEOUT
+    }
+    return None
+
+
+def poll_pending_job():
+    """
+    Polls the pending job once and shows its progress. Runs on every rerun,
+    so clicking other widgets does not lose the job.
+
+    Returns:
+        bool: True while the job is still running
+    """
+    pending = st.session_state.pending_job
+    result, job = check_job(pending["job_id"])
+    if result is None and time.time() > pending["deadline"]:
+        result = {"error": f"Analysis did not finish within {JOB_TIMEOUT} seconds"}
+    if result is None:
+        stage = job.get("stage") or job["status"]
+        st.progress(int(job["progress"] * 100), text=f"🔍 {stage.capitalize()}...")
+        return True
+    
+    st.session_state.pending_job = None
+    if "error" not in result:
+        get_result_cache().put(pending["key"], result)
+    st.session_state.api_response = result
+    return False
+
+
+depth_label = st.selectbox("Analysis depth", list(DEPTHS))
+
 if st.button("Analyze Contract", type="primary", key="analyze"):
-    with st.spinner("🔍 Analyzing contract for vulnerabilities..."):
-        st.session_state.api_response = analyze_contract(contract_code)
+    st.session_state.api_response = start_analysis(contract_code, DEPTHS[depth_label])
+
+job_running = st.session_state.pending_job is not None and poll_pending_job()
 
 if st.session_state.api_response:
     if "error" in st.session_state.api_response:
@@ -152,7 +289,7 @@ if st.session_state.api_response:
             **Troubleshooting steps:**
             1. Ensure your API server is running at `http://localhost:8000`
             2. Check the terminal where you ran `python main.py` for errors
-            3. Verify the endpoint matches exactly: `/predict`
+            3. Verify the endpoints match exactly: `/jobs` and `/jobs/{id}`
             """)
     else:
         try:
@@ -169,19 +306,20 @@ if st.session_state.api_response:
             st.progress(risk_percentage)
             
             # Risk classification
-            if risk_score > 0.75:
+            band = model_score_band(risk_score)
+            if band == "critical":
                 risk_class = "high"
                 risk_emoji = "🔴"
                 risk_text = "Critical Risk"
                 risk_alert = st.error
                 alert_message = "**Immediate attention required!** This contract shows multiple high-risk patterns."
-            elif risk_score > 0.5:
+            elif band == "high":
                 risk_class = "medium"
                 risk_emoji = "🟠"
                 risk_text = "High Risk"
                 risk_alert = st.warning
                 alert_message = "**Potential vulnerabilities detected.** Requires careful review."
-            elif risk_score > 0.25:
+            elif band == "moderate":
                 risk_class = "medium"
                 risk_emoji = "🟡"
                 risk_text = "Moderate Risk"
@@ -205,7 +343,7 @@ if st.session_state.api_response:
             with st.expander("📋 Detailed Analysis", expanded=True):
                 st.markdown(f"**Interpretation:** {interpretation}")
                 
-                if risk_score > 0.5:
+                if band in ("critical", "high"):
                     st.markdown("""
                     **Recommended Actions:**
                     - Conduct thorough security review
@@ -220,6 +358,10 @@ if st.session_state.api_response:
                     - Gas optimization review
                     """)
             
+            if "report" in st.session_state.api_response:
+                with st.expander("🛡️ LLM Audit Report", expanded=True):
+                    st.text(st.session_state.api_response["report"])
+            
             # Technical details
             with st.expander("⚙️ Technical Details"):
                 st.json(st.session_state.api_response)
@@ -280,4 +422,9 @@ st.markdown("---")
 st.caption("""
 Smart Contract Risk Analyzer v2.0 | For educational and research purposes only | 
 [Report Issues](https://github.com/your-repo/issues)
-""")
\ No newline at end of file
+""")
+
+# Poll again shortly; the rerun picks the pending job up from session state.
+if job_running:
+    time.sleep(POLL_INTERVAL)
+    st.rerun()
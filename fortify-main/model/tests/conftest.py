@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The service modules are flat files next to this directory, imported by name like main.py does.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
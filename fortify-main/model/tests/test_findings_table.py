@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from findings_table import (
+    DEFAULT_POLICY, FindingsTable, contract_scores, normalize_severity, parse_lines,
+    portfolio_summary, severity_counts, severity_histogram, shift_lines,
+)
+
+ANALYSES = [
+    ("a.sol", [
+        {"vulnerability_name": "Reentrancy", "severity": "Critical", "affected_code_lines": "10-14"},
+        {"vulnerability_name": "reentrancy ", "severity": "high", "affected_code_lines": [3, 7]},
+    ]),
+    ("b.sol", [{"vulnerability_name": "Front-Running", "severity": "Low"}]),
+    ("c.sol", {"error": "quota"}),
+]
+
+
+def test_normalize_severity_and_counts():
+    assert normalize_severity(" HIGH ") == "High"
+    assert normalize_severity("n/a") == normalize_severity("severe") == normalize_severity(None) == "N/A"
+    counts = severity_counts([{"severity": "high"}, {"severity": "High"}, {"severity": "N/A"}, {}])
+    assert counts == {"Critical": 0, "High": 2, "Medium": 0, "Low": 0}
+    assert list(counts) == ["Critical", "High", "Medium", "Low"]
+
+
+def test_policy_score_and_bands():
+    assert DEFAULT_POLICY.score([{"severity": "high"}, {"severity": "Medium"}]) == pytest.approx(0.4)
+    assert DEFAULT_POLICY.score([{"severity": "Critical"}] * 3) == 1.0
+    assert DEFAULT_POLICY.score([]) == 0.0
+    assert [DEFAULT_POLICY.band(s) for s in (0.9, 0.7, 0.5, 0.2, 0.1)] == [
+        "critical", "critical", "significant", "moderate", "minor"]
+
+
+def test_parse_lines():
+    assert parse_lines("10-14") == (10, 14)
+    assert parse_lines([3, 7]) == (3, 7)
+    assert parse_lines(5) == (5, 5)
+    assert parse_lines("n/a") == (-1, -1)
+
+
+def test_table_scores_match_policy():
+    table = FindingsTable.from_analyses(ANALYSES)
+    assert table.contracts == ["a.sol", "b.sol", "c.sol"]
+    assert table.categories == ["reentrancy", "front-running"]
+    expected = [DEFAULT_POLICY.score(f if isinstance(f, list) else []) for _, f in ANALYSES]
+    np.testing.assert_allclose(contract_scores(table), expected)
+    assert severity_histogram(table).tolist() == [[0, 0, 0, 1, 1], [0, 1, 0, 0, 0], [0, 0, 0, 0, 0]]
+
+
+def test_portfolio_summary():
+    summary = portfolio_summary(FindingsTable.from_analyses(ANALYSES))
+    assert summary["findings"] == 3
+    assert summary["contracts_with_critical"] == 1
+    assert summary["contracts_by_band"] == {"critical": 0, "significant": 1, "moderate": 0, "minor": 2}
+    assert summary["top_categories"][0] == ("reentrancy", 2)
+
+
+def test_many_categories_fit(tmp_path):
+    findings = [{"vulnerability_name": f"issue {i}", "severity": "Low"} for i in range(40000)]
+    table = FindingsTable.from_analyses([("big.sol", findings)])
+    assert table.category.max() == 39999
+    table.save(tmp_path / "table.npz")
+    loaded = FindingsTable.load(tmp_path / "table.npz")
+    assert loaded.categories[-1] == "issue 39999"
+    np.testing.assert_array_equal(loaded.category, table.category)
+
+
+def test_shift_lines_keeps_the_form():
+    assert shift_lines("10-14", 20) == "30-34"
+    assert shift_lines([3, 7], 20) == [23, 27]
+    assert shift_lines(5, -1) == 4
+    assert shift_lines("Not specified", 20) == "Not specified"
+    assert shift_lines(None, 20) is None
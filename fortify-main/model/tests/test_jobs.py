@@ -0,0 +1,113 @@
+import threading
+import time
+
+from jobs import JobStore, JobWorkerPool
+
+
+def make_store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+CODE = "contract A { function f() public {} }"
+
+
+def test_submit_deduplicates_per_depth_and_model_version(tmp_path):
+    store = make_store(tmp_path)
+    first, created = store.submit(CODE, "score", model_version="v1")
+    again, created_again = store.submit(CODE, "score", model_version="v1")
+    assert created and not created_again
+    assert again["id"] == first["id"]
+    assert store.submit(CODE, "score", model_version="v2")[1]
+    assert store.submit(CODE, "audit")[1]
+
+
+def test_force_and_failed_jobs_are_requeued(tmp_path):
+    store = make_store(tmp_path)
+    job, _ = store.submit(CODE, "audit")
+    forced, created = store.submit(CODE, "audit", force=True)
+    assert created and forced["id"] != job["id"]
+    store.update(job["id"], status="failed", error="boom")
+    store.update(forced["id"], status="failed", error="boom")
+    retried, created = store.submit(CODE, "audit")
+    assert created and retried["id"] not in (job["id"], forced["id"])
+
+
+def test_claim_next_is_fifo_and_claims_once(tmp_path):
+    store = make_store(tmp_path)
+    first, _ = store.submit(CODE, "score")
+    second, _ = store.submit(CODE + "//", "score")
+    claimed = store.claim_next()
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == "running" and claimed["code"] == CODE
+    # A second process sharing the database sees only the remaining job.
+    assert make_store(tmp_path).claim_next()["id"] == second["id"]
+    assert store.claim_next() is None
+
+
+def test_live_running_jobs_are_not_reclaimed(tmp_path):
+    store = make_store(tmp_path)
+    job, _ = store.submit(CODE, "score")
+    store.claim_next()
+    # Another live process starting up must not take the job away.
+    assert make_store(tmp_path).claim_next() is None
+    assert store.submit(CODE, "score") == (store.get(job["id"]), False)
+
+
+def test_stale_running_jobs_are_reclaimed_and_not_deduplicated(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), stale_after=0.05)
+    job, _ = store.submit(CODE, "score")
+    store.claim_next()
+    time.sleep(0.1)
+    # A crashed worker stops refreshing its job: resubmitting queues a fresh one,
+    # and the orphan becomes claimable again.
+    fresh, created = store.submit(CODE, "score")
+    assert created
+    assert store.claim_next()["id"] == job["id"]
+    assert store.claim_next()["id"] == fresh["id"]
+
+
+def test_touch_keeps_running_jobs_alive(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), stale_after=0.2)
+    job, _ = store.submit(CODE, "score")
+    store.claim_next()
+    for _ in range(3):
+        time.sleep(0.1)
+        store.touch([job["id"]])
+    assert store.claim_next() is None
+
+
+def test_worker_pool_runs_jobs_and_reports_completion(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), stale_after=0.2)
+    completed = threading.Event()
+    calls = []
+
+    def score(code, contract_name):
+        calls.append(code)
+        time.sleep(0.3)
+        return {"risk_score": 0.5}
+
+    pool = JobWorkerPool(
+        store,
+        handlers={"score": score},
+        poll_interval=0.01,
+        on_complete=lambda job, result: completed.set(),
+    )
+    job, _ = store.submit(CODE, "score")
+    pool.start()
+    try:
+        # The step outlives stale_after, so only the heartbeat keeps a second worker off it.
+        assert completed.wait(5)
+    finally:
+        pool.stop()
+    assert len(calls) == 1
+    stored = store.get(job["id"])
+    assert stored["status"] == "done" and stored["result"] == {"score": {"risk_score": 0.5}}
+
+
+def test_update_round_trips_result(tmp_path):
+    store = make_store(tmp_path)
+    job, _ = store.submit(CODE, "score")
+    store.update(job["id"], status="done", progress=1.0, result={"score": {"risk_score": 0.5}})
+    stored = store.get(job["id"])
+    assert stored["result"] == {"score": {"risk_score": 0.5}}
+    assert "code" not in stored
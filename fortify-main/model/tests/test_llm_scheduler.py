@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+import llm_backends
+from llm_backends import SyntheticBackend, TransientBackendError
+from llm_scheduler import BULK, INTERACTIVE, KeyBudget, LLMScheduler, RateWindow
+
+
+def test_window_waits_for_the_oldest_grants_to_age_out():
+    window = RateWindow(120)
+    window.take(60, now=0.0)
+    window.take(60, now=10.0)
+    assert window.wait_time(1, now=20.0) == pytest.approx(40.0)
+    assert window.wait_time(61, now=20.0) == pytest.approx(50.0)
+    assert window.wait_time(60, now=60.0) == 0.0
+
+
+@pytest.mark.parametrize("per_minute", [2, 5, 60])
+def test_window_sustains_the_quota_without_exceeding_it_in_any_minute(per_minute):
+    window = RateWindow(per_minute)
+    grants, now = [], 0.0
+    while now < 600:
+        wait = window.wait_time(1, now)
+        if wait == 0:
+            window.take(1, now)
+            grants.append(now)
+        now += max(wait, 0.01)
+    assert len(grants) >= 10 * per_minute - 1
+    assert max(sum(1 for t in grants if start <= t < start + 60) for start in grants) <= per_minute
+
+
+def test_oversized_request_waits_for_an_empty_window_and_is_charged_in_full():
+    window = RateWindow(120)
+    window.take(1, now=0.0)
+    assert window.wait_time(150, now=1.0) == pytest.approx(59.0)
+    window.take(150, now=60.0)
+    assert window.wait_time(1, now=119.0) == pytest.approx(1.0)
+
+
+def test_drain_backs_off_for_the_given_seconds():
+    window = RateWindow(120)
+    window.drain(5, now=0.0)
+    assert window.wait_time(1, now=0.0) == pytest.approx(5.0)
+    assert window.wait_time(1, now=5.0) == 0.0
+
+
+def test_key_budget_waits_on_the_tighter_window():
+    budget = KeyBudget("key", requests_per_minute=120, tokens_per_minute=1200)
+    budget.take(1200, now=0.0)
+    assert budget.wait_time(60, now=6.0) == pytest.approx(54.0)
+
+
+def test_unlimited_budget_never_waits():
+    budget = KeyBudget("offline")
+    budget.take(10 ** 9, now=0.0)
+    assert budget.wait_time(10 ** 9, now=0.0) == 0.0
+
+
+class ScriptedBackend(SyntheticBackend):
+    """Synthetic backend that records each call and fails the first calls with the given status codes."""
+
+    def __init__(self, failures=()):
+        super().__init__(latency_ms=0)
+        self.failures = list(failures)
+        self.calls = []
+        self._script_lock = threading.Lock()
+
+    def generate(self, prompt, api_key):
+        with self._script_lock:
+            self.calls.append((prompt, api_key))
+            code = self.failures.pop(0) if self.failures else None
+        if code is not None:
+            raise TransientBackendError(code, f"scripted {code}")
+        return super().generate(prompt, api_key)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def install(failures=()):
+        scripted = ScriptedBackend(failures)
+        monkeypatch.setattr(llm_backends, "_backend", scripted)
+        return scripted
+    return install
+
+
+def scheduler(keys=("key-a",), requests_per_minute=1200, **kwargs):
+    return LLMScheduler(api_keys=list(keys), requests_per_minute=requests_per_minute,
+                        tokens_per_minute=1e12, workers=1, base_delay=0.01, **kwargs)
+
+
+def test_interactive_request_overtakes_rate_limited_bulk_backlog(backend):
+    scripted = backend()
+    pool = scheduler(requests_per_minute=60)
+    # A full window whose grants start ageing out shortly, one every 10ms.
+    start = time.monotonic() - 60 + 0.2
+    for i in range(60):
+        pool.budgets[0].requests.take(1, start + i * 0.01)
+    bulk = [pool.submit(f"contract Bulk{i} {{}}", BULK) for i in range(3)]
+    interactive = pool.submit("contract Urgent {}", INTERACTIVE)
+    results = [f.result(timeout=10) for f in [interactive] + bulk]
+    assert all(isinstance(r, list) for r in results)
+    order = [next(name for name in ("Urgent", "Bulk0", "Bulk1", "Bulk2") if name in prompt)
+             for prompt, _ in scripted.calls]
+    assert order == ["Urgent", "Bulk0", "Bulk1", "Bulk2"]
+
+
+def test_transient_errors_are_retried_until_success(backend):
+    scripted = backend(failures=[503, 500])
+    result = scheduler().analyze("contract A {}")
+    assert isinstance(result, list)
+    assert len(scripted.calls) == 3
+    for finding in result:
+        assert {"vulnerability_name", "severity", "affected_code_lines"} <= set(finding)
+
+
+def test_rate_limited_key_is_rested_and_retry_uses_another(backend):
+    scripted = backend(failures=[429])
+    pool = scheduler(keys=("key-a", "key-b"))
+    assert isinstance(pool.analyze("contract A {}"), list)
+    first_key, retry_key = [key for _, key in scripted.calls]
+    assert first_key != retry_key
+
+
+def test_retries_give_up_after_max_retries(backend):
+    scripted = backend(failures=[503] * 5)
+    result = scheduler(max_retries=2).analyze("contract A {}")
+    assert result == {"error": "scripted 503"}
+    assert len(scripted.calls) == 3
+
+
+def test_non_transient_errors_are_not_retried(backend):
+    scripted = backend(failures=[400])
+    assert scheduler().analyze("contract A {}") == {"error": "scripted 400"}
+    assert len(scripted.calls) == 1
@@ -0,0 +1,131 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import project_ingest
+from project_ingest import (
+    ProjectAnalyzer,
+    build_import_graph,
+    dependency_prefixes,
+    is_dependency,
+    normalize_paths,
+    reachable_files,
+)
+
+
+def test_resolves_relative_and_natural_layout_packages():
+    files = {
+        "./contracts/Token.sol": (
+            'import "@openzeppelin/contracts/token/ERC20/ERC20.sol";\n'
+            'import {Owned} from "solmate/auth/Owned.sol";\n'
+            'import "./lib/Math.sol";\n'
+        ),
+        "contracts/lib/Math.sol": "library Math {}",
+        "@openzeppelin/contracts/token/ERC20/ERC20.sol": "contract ERC20 {}",
+        "solmate/src/auth/Owned.sol": "contract Owned {}",
+    }
+    graph, unresolved = build_import_graph(files)
+    assert unresolved == []
+    assert graph["contracts/Token.sol"] == [
+        "@openzeppelin/contracts/token/ERC20/ERC20.sol",
+        "solmate/src/auth/Owned.sol",
+        "contracts/lib/Math.sol",
+    ]
+
+
+def test_resolves_node_modules_and_lib_layouts():
+    files = {
+        "src/A.sol": 'import "@openzeppelin/contracts/access/Ownable.sol";\nimport "solmate/tokens/ERC20.sol";',
+        "node_modules/@openzeppelin/contracts/access/Ownable.sol": "contract Ownable {}",
+        "lib/solmate/src/tokens/ERC20.sol": "contract ERC20 {}",
+    }
+    graph, unresolved = build_import_graph(files)
+    assert unresolved == []
+    assert graph["src/A.sol"] == [
+        "node_modules/@openzeppelin/contracts/access/Ownable.sol",
+        "lib/solmate/src/tokens/ERC20.sol",
+    ]
+
+
+def test_custom_remapping_and_unresolved_imports():
+    files = {
+        "src/A.sol": 'import "forge-std/Test.sol";\nimport "./Missing.sol";\n// import "./Commented.sol";',
+        "vendor/forge-std/src/Test.sol": "contract Test {}",
+    }
+    graph, unresolved = build_import_graph(files, {"forge-std/": "vendor/forge-std/src/"})
+    assert graph["src/A.sol"] == ["vendor/forge-std/src/Test.sol"]
+    assert unresolved == [{"file": "src/A.sol", "import": "./Missing.sol"}]
+
+
+def test_normalize_paths_rejects_collisions():
+    assert list(normalize_paths({"./a//b/../c.sol": ""})) == ["a/c.sol"]
+    with pytest.raises(ValueError):
+        normalize_paths({"a.sol": "", "./a.sol": ""})
+
+
+def test_reachable_files_follows_imports_transitively():
+    graph = {"A": ["B"], "B": ["C"], "C": [], "D": ["A"]}
+    assert reachable_files(graph, ["A"]) == {"A", "B", "C"}
+
+
+def test_is_dependency():
+    assert is_dependency("node_modules/x/A.sol")
+    assert is_dependency("@openzeppelin/contracts/A.sol")
+    assert not is_dependency("contracts/A.sol")
+    assert is_dependency("solmate/src/A.sol", ("solmate/",))
+
+
+def test_dependency_prefixes_include_remapping_targets():
+    prefixes = dependency_prefixes({"forge-std/": "vendor/forge-std/src/"})
+    assert is_dependency("vendor/forge-std/src/Test.sol", prefixes)
+    assert is_dependency("forge-std/Test.sol", prefixes)
+    assert is_dependency("lib/solmate/src/tokens/ERC20.sol", prefixes)
+    assert not is_dependency("src/A.sol", prefixes)
+
+
+class FakeCache:
+    def __init__(self):
+        self.findings = {}
+
+    def get_findings(self, fingerprints):
+        return {fp: self.findings[fp] for fp in fingerprints if fp in self.findings}
+
+    def put_findings(self, findings):
+        self.findings.update(findings)
+
+
+class HeldScheduler:
+    """Scheduler whose audits stay running until release() is called."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, source, priority):
+        future = Future()
+        self.submitted.append((source, priority, future))
+        return future
+
+    def release(self, result):
+        for _, _, future in self.submitted:
+            future.set_result(result)
+
+
+def test_running_audits_are_shared_between_uploads():
+    cache, scheduler = FakeCache(), HeldScheduler()
+    first = ProjectAnalyzer(None, cache, scheduler)
+    second = ProjectAnalyzer(None, cache, scheduler)
+    files, unique = {"lib/A.sol": "contract A {}"}, {"fp-a": "lib/A.sol"}
+
+    _, _, background = first._audit(files, unique, {"lib/A.sol": True})
+    assert background == {"fp-a"}
+    # A second upload of the same dependency, now as an own file, waits on the running audit.
+    waiter = threading.Thread(target=second._audit, args=(files, unique, {"lib/A.sol": False}))
+    waiter.start()
+    scheduler.release([{"title": "Reentrancy"}])
+    waiter.join(timeout=5)
+
+    assert not waiter.is_alive()
+    assert len(scheduler.submitted) == 1
+    assert cache.findings == {"fp-a": [{"title": "Reentrancy"}]}
+    assert "fp-a" not in project_ingest._in_flight
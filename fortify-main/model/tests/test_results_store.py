@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+import threading
+
+import pytest
+
+from results_store import ResultsStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    for i in range(7):
+        store.record(f"hash{i % 3}", "predict", risk_score=i / 10, model_version=f"v{i % 2}",
+                     contract_name=f"C{i}", findings=[{"severity": "high"}, {"severity": "Critical"}] if i == 6 else None)
+    return store
+
+
+def test_record_counts_severities_case_insensitively(store):
+    latest = store.latest("hash0")
+    assert latest["contract_name"] == "C6"
+    assert (latest["critical"], latest["high"], latest["medium"], latest["low"]) == (1, 1, 0, 0)
+    assert store.latest("hash1")["high"] is None
+
+
+def test_query_filters_and_paginates(store):
+    page = store.query(limit=2, min_score=0.3, model_version="v1", order_by="risk_score", descending=False)
+    assert page["total"] == 2
+    assert [row["risk_score"] for row in page["items"]] == [0.3, 0.5]
+    assert store.query(min_high=1)["total"] == 1
+    with pytest.raises(ValueError):
+        store.query(order_by="id; DROP TABLE results")
+
+
+def test_export_jsonl_pages_through_all_rows(store):
+    rows = [json.loads(line) for chunk in store.export("jsonl", batch_size=2) for line in chunk.splitlines()]
+    assert [row["contract_name"] for row in rows] == [f"C{i}" for i in range(7)]
+
+
+def test_export_can_be_advanced_from_other_threads(store):
+    chunks = store.export("csv", batch_size=3, min_score=0.2)
+    out = [next(chunks)]
+    thread = threading.Thread(target=lambda: out.extend(chunks))
+    thread.start()
+    thread.join()
+    rows = list(csv.reader(io.StringIO("".join(out))))
+    assert rows[0][0] == "id"
+    assert [row[4] for row in rows[1:]] == ["0.2", "0.3", "0.4", "0.5", "0.6"]
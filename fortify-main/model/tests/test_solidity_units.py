@@ -0,0 +1,96 @@
+from solidity_units import fingerprint, mask_comments_and_strings, split_units
+
+SOURCE = """pragma solidity ^0.8.0;
+
+contract Vault {
+    mapping(address => uint) balances;
+
+    modifier onlyOwner() { _; }
+
+    function deposit() public payable {
+        balances[msg.sender] += msg.value; // credit the sender
+    }
+
+    function withdraw(uint amount) public {
+        require(balances[msg.sender] >= amount, "low balance {");
+        balances[msg.sender] -= amount;
+    }
+
+    function withdraw() public {
+        withdraw(balances[msg.sender]);
+    }
+}
+"""
+
+
+def keys(code):
+    return [u.key for u in split_units(code)]
+
+
+def test_split_units_keys_contract_and_members():
+    assert keys(SOURCE) == [
+        "Vault.contract",
+        "Vault.modifier:onlyOwner()",
+        "Vault.function:deposit()",
+        "Vault.function:withdraw(uint amount)",
+        "Vault.function:withdraw()",
+    ]
+
+
+def test_brace_inside_string_does_not_end_function():
+    withdraw = next(u for u in split_units(SOURCE) if u.key == "Vault.function:withdraw(uint amount)")
+    assert withdraw.source.rstrip().endswith("}")
+    assert "balances[msg.sender] -= amount;" in withdraw.source
+
+
+def test_comment_and_whitespace_edits_keep_fingerprints():
+    edited = SOURCE.replace("// credit the sender", "// updated comment").replace("    balances;", "balances;")
+    assert [u.fingerprint for u in split_units(edited)] == [u.fingerprint for u in split_units(SOURCE)]
+
+
+def test_code_and_string_edits_change_only_that_unit():
+    edited = SOURCE.replace('"low balance {"', '"insufficient"')
+    before = {u.key: u.fingerprint for u in split_units(SOURCE)}
+    after = {u.key: u.fingerprint for u in split_units(edited)}
+    changed = [key for key in before if before[key] != after[key]]
+    assert changed == ["Vault.function:withdraw(uint amount)"]
+
+
+def test_masking_keeps_offsets_and_strings_with_slashes():
+    code = 'string s = "http://x"; // note\n/* block */ uint y;'
+    masked = mask_comments_and_strings(code, strings=False)
+    assert len(masked) == len(code)
+    assert '"http://x"' in masked
+    assert "note" not in masked and "block" not in masked
+
+
+def test_fingerprint_ignores_whitespace_only():
+    assert fingerprint("uint  x;\n") == fingerprint("uint x;")
+    assert fingerprint("uint x;") != fingerprint("uint y;")
+
+
+def test_code_outside_contracts_forms_a_file_unit():
+    code = "pragma solidity ^0.8.0;\nerror Low();\n\n" + SOURCE + "\nfunction free() pure returns (uint) { return 1; }\n"
+    units = split_units(code)
+    assert units[0].key == "file" and units[0].start == 0
+    assert "error Low();" in units[0].source and "function free()" in units[0].source
+    assert "balances" not in units[0].source
+    # Contracts are blanked to their line breaks, so the unit's lines line up with the file's.
+    assert units[0].source.splitlines().index("function free() pure returns (uint) { return 1; }") == \
+        code.splitlines().index("function free() pure returns (uint) { return 1; }")
+    assert keys(code)[1:] == keys(SOURCE)
+    assert split_units("function free() pure returns (uint) { return 1; }")[0].key == "file"
+
+
+def test_pragmas_and_imports_alone_yield_no_file_unit():
+    assert keys('// SPDX-License-Identifier: MIT\npragma solidity ^0.8.0;\nimport "./A.sol";\n' + SOURCE) == keys(SOURCE)
+    assert split_units("pragma solidity ^0.8.0;") == []
+
+
+def test_contract_skeleton_keeps_line_numbers():
+    skeleton = split_units(SOURCE)[0]
+    original = SOURCE[skeleton.start:skeleton.end].splitlines()
+    lines = skeleton.source.splitlines()
+    assert len(lines) == len(original)
+    assert lines.index("    mapping(address => uint) balances;") == original.index("    mapping(address => uint) balances;")
+    assert lines[-1] == original[-1] == "}"
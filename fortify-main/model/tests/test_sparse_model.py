@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sparse_model import SparseRiskModel, list_corpus, train
+
+VULNERABLE = """contract Bank{i} {{
+    mapping(address => uint) balances;
+    function withdraw() public {{
+        (bool ok, ) = msg.sender.call{{value: balances[msg.sender]}}("");
+        require(ok);
+        balances[msg.sender] = 0;
+    }}
+}}
+"""
+
+SECURE = """contract Vault{i} {{
+    mapping(address => uint) balances;
+    function withdraw() public nonReentrant {{
+        uint amount = balances[msg.sender];
+        balances[msg.sender] = 0;
+        payable(msg.sender).transfer(amount);
+    }}
+}}
+"""
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    for name, template in (("secure", SECURE), ("vulnerable", VULNERABLE)):
+        (tmp_path / name).mkdir()
+        for i in range(20):
+            (tmp_path / name / f"{name}_{i}.sol").write_text(template.format(i=i))
+    return tmp_path
+
+
+def test_list_corpus_labels_by_directory(corpus):
+    labels = [label for _, label in list_corpus(corpus)]
+    assert labels.count(0) == labels.count(1) == 20
+
+
+def test_trained_model_separates_the_classes(corpus):
+    model = train(corpus, epochs=5, chunk_size=8, feature_spec={"n_features": 2 ** 16})
+    secure = model.predict([SECURE.format(i=100)])
+    vulnerable = model.predict([VULNERABLE.format(i=100)])
+    assert vulnerable[0] > 0.5 > secure[0]
+
+
+def test_save_load_round_trip_keeps_feature_spec(corpus, tmp_path):
+    model = train(corpus, epochs=2, feature_spec={"n_features": 2 ** 16, "ngram_range": [1, 2]})
+    path = tmp_path / "sparse_model.npz"
+    model.save(path)
+    loaded = SparseRiskModel.load(path)
+    assert loaded.feature_spec == model.feature_spec
+    assert loaded.feature_spec["n_features"] == 2 ** 16 and loaded.feature_spec["ngram_range"] == [1, 2]
+    texts = [SECURE.format(i=1), VULNERABLE.format(i=1)]
+    np.testing.assert_allclose(loaded.predict(texts), model.predict(texts), rtol=1e-6)
+
+
+def test_train_rejects_an_empty_corpus(tmp_path):
+    with pytest.raises(ValueError):
+        train(tmp_path)